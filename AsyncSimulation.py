@@ -0,0 +1,286 @@
+import asyncio
+import json
+import logging
+import numbers
+
+logger = logging.getLogger(__name__)
+
+COMMANDS = ("move", "return_home", "land", "pause", "resume")
+HOLD_STATES = ("Taking off", "Landing")
+
+class AsyncSimulation:
+    """Non-blocking runtime around a SimulationEngine for asyncio programs.
+
+    Simulation ticks, viewer frames, sensor publishes and drone commands each run as their
+    own task on the event loop, so controllers talking to the drone (in process or over the
+    JSON-lines socket from serve()) are answered between ticks instead of after a blocking
+    frame. A tick_rate of None steps as fast as possible, still yielding between ticks.
+    """
+    def __init__(self, engine, tick_rate=10, viewer=None, fps=10, sensor_rate=None, hold=0):
+        self.engine = engine
+        self.drone = engine.drone
+        self.tick_rate = tick_rate  # Ticks per second of wall time, None for as fast as possible
+        self.viewer = viewer  # Optional DroneSimulator built with start=False
+        self.fps = fps
+        self.sensor_rate = sensor_rate  # Sensor publishes per second, None for one after every tick
+        self.hold = hold  # Seconds to wait on the takeoff and landing frames, like the viewer does
+        self.commands = asyncio.Queue()
+        self.subscribers = set()
+        self.pending_move = None  # Direction commanded for the next tick, instead of the planner's
+        self.tasks = []
+        self.servers = []
+        self.clients = {}  # Connection task -> stream writer of every connected controller
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+        self._ticked = asyncio.Event()
+        self._finished = asyncio.Event()
+        self._error = None  # Exception that stopped the tick task, raised again to whoever waits on it
+
+    async def start(self):
+        """Schedule the tick, render, sensor and command tasks."""
+        self.tasks.append(asyncio.create_task(self._run_ticks()))
+        self.tasks.append(asyncio.create_task(self._run_commands()))
+        self.tasks.append(asyncio.create_task(self._run_sensors()))
+        if self.viewer is not None:
+            self.tasks.append(asyncio.create_task(self._run_frames()))
+
+    async def run(self):
+        """Start the tasks and run until the drone lands, or with a viewer until its window is closed."""
+        await self.start()
+        try:
+            if self.viewer is not None:
+                # Until the frame task ends, or the tick task fails
+                await asyncio.wait((self.tasks[0], self.tasks[-1]), return_when=asyncio.FIRST_EXCEPTION)
+                self._raise_error()
+            else:
+                await self.wait_finished()
+        finally:
+            await self.close()
+
+    async def close(self):
+        """Cancel every task, disconnect the controllers and close the servers."""
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)  # Ends the stream
+        for writer in self.clients.values():
+            writer.close()
+        await asyncio.gather(*self.clients, return_exceptions=True)
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.servers = []
+
+    async def wait_finished(self):
+        """Wait until the drone has landed, raising the error that stopped the tick task if it failed."""
+        await self._finished.wait()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    @property
+    def paused(self):
+        return not self._resumed.is_set()
+
+    def pause(self):
+        """Stop the tick task after the current tick. step() still advances the simulation."""
+        self._resumed.clear()
+
+    def resume(self):
+        """Restart the tick task."""
+        self._resumed.set()
+
+    async def step(self, count=1):
+        """Advance the simulation by count ticks right away and return its state."""
+        for _ in range(count):
+            if self.engine.finished:
+                break
+            self._tick()
+        return self.state()
+
+    async def get_sensor_data(self):
+        """Sensor readings of the drone as of the last tick."""
+        return self.drone.get_sensor_data()
+
+    def state(self):
+        """Step, time, position, battery and flight state of the drone."""
+        drone = self.drone
+        return {'step': self.engine.steps, 'time': drone.time_elapsed, 'position': list(drone.position),
+                'battery': drone.battery_level, 'flight_state': drone.flight_state}
+
+    async def send_command(self, command, **arguments):
+        """Queue a command for the drone and wait until it has been applied, returning the new state.
+
+        "move" flies the next tick in arguments["direction"] instead of the planner's choice,
+        "return_home" turns back now, "land" lands where the drone is, "pause" and "resume"
+        control the tick task.
+        """
+        if command not in COMMANDS:
+            raise ValueError(f"unknown command {command!r}, expected one of {', '.join(COMMANDS)}")
+        applied = asyncio.get_running_loop().create_future()
+        await self.commands.put((command, arguments, applied))
+        return await applied
+
+    def subscribe(self, maxsize=64):
+        """Queue that receives a sensor publish (state plus readings) at the sensor rate.
+
+        When a subscriber falls behind, its oldest publishes are dropped. None marks the end,
+        when the simulation is closed.
+        """
+        queue = asyncio.Queue(maxsize)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    async def serve(self, host="127.0.0.1", port=0):
+        """Accept controllers on a local TCP socket speaking JSON lines, and return the server.
+
+        Each request line is an object with an "op": "state", "sensors", "step" (with an
+        optional "count"), "pause", "resume", "command" (with "command" and its arguments)
+        or "subscribe", which streams every sensor publish until the client disconnects.
+        Every reply is one line with "ok" and either the result or an "error".
+        """
+        server = await asyncio.start_server(self._serve_client, host, port)
+        self.servers.append(server)
+        logger.info("Serving the simulation on %s", ", ".join(str(sock.getsockname()) for sock in server.sockets))
+        return server
+
+    def _tick(self):
+        move, self.pending_move = self.pending_move, None
+        self.engine.step(move)
+        self._ticked.set()
+        if self.engine.finished:
+            self._finished.set()
+
+    async def _run_ticks(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        try:
+            while not self.engine.finished:
+                await self._resumed.wait()
+                if self.hold and self.drone.flight_state in HOLD_STATES:
+                    await asyncio.sleep(self.hold)
+                self._tick()
+                if self.tick_rate:
+                    next_tick = max(next_tick + 1 / self.tick_rate, loop.time() - 1 / self.tick_rate)
+                    await asyncio.sleep(next_tick - loop.time())
+                else:
+                    await asyncio.sleep(0)  # Let commands and frames in between ticks
+        except Exception as error:
+            logger.error("Simulation tick failed at step %d: %r", self.engine.steps, error)
+            self._error = error
+            self._finished.set()  # Nothing will tick any more, release the waiters
+            raise
+
+    async def _run_commands(self):
+        while True:
+            command, arguments, applied = await self.commands.get()
+            try:
+                self._apply(command, arguments)
+            except Exception as error:
+                applied.set_exception(error)
+            else:
+                applied.set_result(self.state())
+
+    def _apply(self, command, arguments):
+        drone = self.drone
+        logger.debug("Command %s %s", command, arguments)
+        if command == "move":
+            direction = arguments.get('direction')
+            if not (isinstance(direction, (list, tuple)) and len(direction) == 2
+                    and all(isinstance(step, numbers.Integral) and -1 <= step <= 1 for step in direction) and any(direction)):
+                raise ValueError(f"direction must be a step to a neighbouring cell, like [1, 0] or [1, -1], not {direction!r}")
+            self.pending_move = (int(direction[0]), int(direction[1]))
+        elif command == "return_home":
+            if drone.flight_state == "Flying":
+                drone.start_returning_home()
+                drone.flight_state = "Returning home"
+        elif command == "land":
+            if drone.flight_state in ("Flying", "Returning home"):
+                drone.flight_state = "Landing"
+        elif command == "pause":
+            self.pause()
+        elif command == "resume":
+            self.resume()
+
+    async def _run_sensors(self):
+        period = 1 / self.sensor_rate if self.sensor_rate else None
+        while True:
+            if period is None:
+                await self._ticked.wait()
+                self._ticked.clear()
+            else:
+                await asyncio.sleep(period)
+            if not self.subscribers:
+                continue
+            publish = self.state()
+            publish['sensors'] = self.drone.get_sensor_data()
+            for queue in self.subscribers:
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(publish)
+            if self.engine.finished and period is None:
+                return
+
+    async def _run_frames(self):
+        viewer = self.viewer
+        while viewer.running:
+            viewer.handle_events()
+            viewer.render_frame()
+            await asyncio.sleep(1 / self.fps)
+
+    async def _serve_client(self, reader, writer):
+        subscription = None
+        task = asyncio.current_task()
+        self.clients[task] = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    op = request.get('op')
+                    if op == "subscribe":
+                        subscription = self.subscribe()
+                        break
+                    reply = {'ok': True, 'result': await self._serve_request(op, request)}
+                except Exception as error:
+                    reply = {'ok': False, 'error': str(error)}
+                writer.write(json.dumps(reply, default=float).encode() + b"\n")
+                await writer.drain()
+            while subscription is not None:
+                publish = await subscription.get()
+                if publish is None:
+                    break
+                writer.write(json.dumps({'ok': True, 'result': publish}, default=float).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if subscription is not None:
+                self.unsubscribe(subscription)
+            self.clients.pop(task, None)
+            writer.close()
+
+    async def _serve_request(self, op, request):
+        if op == "state":
+            return self.state()
+        if op == "sensors":
+            return await self.get_sensor_data()
+        if op == "step":
+            return await self.step(int(request.get('count', 1)))
+        if op in ("pause", "resume"):
+            return await self.send_command(op)
+        if op == "command":
+            arguments = {key: value for key, value in request.items() if key not in ("op", "command")}
+            return await self.send_command(request.get('command'), **arguments)
+        raise ValueError(f"unknown op {op!r}")
@@ -0,0 +1,222 @@
+import numpy as np
+
+PATH_CHUNK = 4096  # Path points per storage chunk
+COVERAGE_SHIFT = 6
+COVERAGE_TILE = 1 << COVERAGE_SHIFT  # Cells per side of a CoverageGrid tile
+COVERAGE_MASK = COVERAGE_TILE - 1
+
+class CoverageGrid:
+    """Visit counts per map cell (saturating at 255), usable like the set of covered positions.
+
+    The counts are kept in square uint8 tiles over the map, created on the first visit to
+    them and shared copy-on-write between copies tile by tile, so a fork only copies the
+    tiles it goes on to visit.
+    """
+    def __init__(self, shape):
+        self.shape = shape
+        self.tiles_x = -(-shape[1] // COVERAGE_TILE)
+        self.tiles = [None] * (-(-shape[0] // COVERAGE_TILE) * self.tiles_x)  # Row-major, None until visited
+        self.shared = [False] * len(self.tiles)  # Tiles that may be shared with a copy, copied before writing
+        self.size = 0  # Number of distinct cells visited
+
+    @classmethod
+    def from_array(cls, counts):
+        """CoverageGrid holding a dense (height, width) array of visit counts."""
+        coverage = cls(counts.shape)
+        for key in range(len(coverage.tiles)):
+            row, column = divmod(key, coverage.tiles_x)
+            block = counts[row * COVERAGE_TILE:(row + 1) * COVERAGE_TILE, column * COVERAGE_TILE:(column + 1) * COVERAGE_TILE]
+            if block.any():
+                tile = coverage.tiles[key] = np.zeros((COVERAGE_TILE, COVERAGE_TILE), dtype=np.uint8)
+                tile[:block.shape[0], :block.shape[1]] = block
+        coverage.size = int(np.count_nonzero(counts))
+        return coverage
+
+    def copy(self):
+        """Copy that shares every tile until either side writes to it."""
+        twin = CoverageGrid.__new__(CoverageGrid)
+        twin.shape, twin.tiles_x, twin.size = self.shape, self.tiles_x, self.size
+        twin.tiles = list(self.tiles)
+        self.shared = [tile is not None for tile in self.tiles]
+        twin.shared = list(self.shared)
+        return twin
+
+    def add(self, position):
+        """Count a visit to position."""
+        x, y = position
+        key = (y >> COVERAGE_SHIFT) * self.tiles_x + (x >> COVERAGE_SHIFT)
+        counts = self.tiles[key]
+        if counts is None:
+            counts = self.tiles[key] = np.zeros((COVERAGE_TILE, COVERAGE_TILE), dtype=np.uint8)
+        elif self.shared[key]:
+            counts = self.tiles[key] = counts.copy()
+            self.shared[key] = False
+        row, column = y & COVERAGE_MASK, x & COVERAGE_MASK
+        count = counts[row, column]
+        if count == 0:
+            self.size += 1
+        if count < 255:
+            counts[row, column] = count + 1
+
+    def __contains__(self, position):
+        x, y = position
+        if not (0 <= y < self.shape[0] and 0 <= x < self.shape[1]):
+            return False
+        counts = self.tiles[(y >> COVERAGE_SHIFT) * self.tiles_x + (x >> COVERAGE_SHIFT)]
+        return counts is not None and counts[y & COVERAGE_MASK, x & COVERAGE_MASK] != 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        ys, xs = np.nonzero(self.to_array())
+        return iter(zip(xs.tolist(), ys.tolist()))
+
+    def to_array(self):
+        """Dense (height, width) uint8 copy of the visit counts."""
+        grid = np.zeros((len(self.tiles) // self.tiles_x * COVERAGE_TILE, self.tiles_x * COVERAGE_TILE), dtype=np.uint8)
+        for key, tile in enumerate(self.tiles):
+            if tile is not None:
+                row, column = divmod(key, self.tiles_x)
+                grid[row * COVERAGE_TILE:(row + 1) * COVERAGE_TILE, column * COVERAGE_TILE:(column + 1) * COVERAGE_TILE] = tile
+        return grid[:self.shape[0], :self.shape[1]]
+
+    def visited(self):
+        """Boolean mask of visited cells, same shape as the map."""
+        return self.to_array() != 0
+
+    def coverage_percentage(self, map_data):
+        """Share of the free cells of the map that have been visited, in percent."""
+        free = np.count_nonzero(map_data[:, :] == 1)
+        return 100.0 * self.size / free if free else 0.0
+
+    def unvisited_neighbours(self, map_data):
+        """Mask of free, unvisited cells next (4-connected) to a visited cell."""
+        visited = self.visited()
+        near = np.zeros_like(visited)
+        near[1:, :] |= visited[:-1, :]
+        near[:-1, :] |= visited[1:, :]
+        near[:, 1:] |= visited[:, :-1]
+        near[:, :-1] |= visited[:, 1:]
+        return near & ~visited & (map_data[:, :] == 1)
+
+class TiledCoverage:
+    """Visit counts kept only for the map tiles the drone has been in, for maps too big for a dense grid."""
+    def __init__(self, tile_size=256):
+        self.tile_size = tile_size
+        self.tiles = {}
+        self.size = 0  # Number of distinct cells visited
+        self.shared = set()  # Tiles that may be shared with a copy, copied before writing
+
+    def copy(self):
+        """Copy that shares every tile until either side writes to it."""
+        twin = TiledCoverage(self.tile_size)
+        twin.tiles, twin.size = dict(self.tiles), self.size
+        self.shared.update(self.tiles)
+        twin.shared = set(self.tiles)
+        return twin
+
+    def add(self, position):
+        """Count a visit to position."""
+        x, y = position
+        key = (y // self.tile_size, x // self.tile_size)
+        counts = self.tiles.get(key)
+        if counts is None:
+            counts = self.tiles[key] = np.zeros((self.tile_size, self.tile_size), dtype=np.uint8)
+        elif key in self.shared:
+            counts = self.tiles[key] = counts.copy()
+            self.shared.discard(key)
+        row, column = y % self.tile_size, x % self.tile_size
+        count = counts[row, column]
+        if count == 0:
+            self.size += 1
+        if count < 255:
+            counts[row, column] = count + 1
+
+    def __contains__(self, position):
+        x, y = position
+        counts = self.tiles.get((y // self.tile_size, x // self.tile_size))
+        return counts is not None and counts[y % self.tile_size, x % self.tile_size] != 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for (tile_y, tile_x), counts in self.tiles.items():
+            ys, xs = np.nonzero(counts)
+            yield from zip((xs + tile_x * self.tile_size).tolist(), (ys + tile_y * self.tile_size).tolist())
+
+class PathStore:
+    """Append-only list of (x, y) path points kept in fixed-size int32 chunks.
+
+    Points after the last full chunk are kept as a plain list of tuples, which is much
+    cheaper to append to than a numpy row, and packed into a chunk once it fills up.
+    """
+    def __init__(self, points=()):
+        self.chunks = []
+        self.tail = []
+        for point in points:
+            self.append(point)
+
+    @classmethod
+    def from_array(cls, points):
+        """PathStore holding the points of an (N, 2) array."""
+        store = cls()
+        full = len(points) - len(points) % PATH_CHUNK
+        store.chunks = [np.array(points[start:start + PATH_CHUNK], dtype=np.int32) for start in range(0, full, PATH_CHUNK)]
+        store.tail = [tuple(point) for point in np.asarray(points[full:]).tolist()]
+        return store
+
+    def copy(self):
+        """Copy that shares the full chunks, which are never written again."""
+        twin = PathStore()
+        twin.chunks, twin.tail = list(self.chunks), list(self.tail)
+        return twin
+
+    def append(self, position):
+        """Add a point, packing the tail into a chunk when it is full."""
+        tail = self.tail
+        tail.append(position)
+        if len(tail) == PATH_CHUNK:
+            self.chunks.append(np.array(tail, dtype=np.int32))
+            self.tail = []
+
+    def __len__(self):
+        return len(self.chunks) * PATH_CHUNK + len(self.tail)
+
+    def __getitem__(self, index):
+        length = len(self)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(length)
+            base = len(self.chunks) * PATH_CHUNK  # Index of the first point in the tail
+            if step != 1:
+                return [tuple(point) for point in self.to_array()[index].tolist()]
+            if stop <= base:
+                return [tuple(point) for point in self.to_array(start, stop).tolist()]
+            # Read the tail part as it is, the usual case of the points added since a given length
+            points = [tuple(point) for point in self.to_array(start, base).tolist()] if start < base else []
+            points.extend(self.tail[max(start - base, 0):stop - base])
+            return points
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("path index out of range")
+        chunk, offset = divmod(index, PATH_CHUNK)
+        x, y = self.chunks[chunk][offset] if chunk < len(self.chunks) else self.tail[offset]
+        return (int(x), int(y))
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def to_array(self, start=0, stop=None):
+        """Points start..stop as an (N, 2) int32 array."""
+        length = len(self)
+        stop = length if stop is None else min(stop, length)
+        if start >= stop:
+            return np.empty((0, 2), dtype=np.int32)
+        first, last = start // PATH_CHUNK, (stop - 1) // PATH_CHUNK
+        blocks = self.chunks[first:last + 1]
+        if last >= len(self.chunks):
+            blocks.append(np.array(self.tail, dtype=np.int32).reshape(-1, 2))
+        points = np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+        return points[start - first * PATH_CHUNK:stop - first * PATH_CHUNK]
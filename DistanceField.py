@@ -0,0 +1,69 @@
+import numpy as np
+
+# Sensor directions, paired with their opposite so map edits can be patched incrementally
+DIRECTIONS = [(0, -1), (0, 1), (-1, 0), (1, 0), (1, 1), (-1, -1)]
+OPPOSITE = {(0, -1): (0, 1), (0, 1): (0, -1), (-1, 0): (1, 0), (1, 0): (-1, 0), (1, 1): (-1, -1), (-1, -1): (1, 1)}
+
+class DistanceField:
+    """Precomputed per-direction step counts to the next wall for every cell of the map."""
+    def __init__(self, map_data, steps=None):
+        self.map_data = map_data
+        self.steps = steps if steps is not None else {direction: self._compute(direction) for direction in DIRECTIONS}
+
+    def _compute(self, direction):
+        """Sweep the map once against the ray direction, one row or column at a time."""
+        dx, dy = direction
+        blocked = self.map_data == 0
+        height, width = self.map_data.shape
+        steps = np.zeros((height, width), dtype=np.int32)
+
+        # steps[p] = 1 + (0 if p + d is a wall else steps[p + d]), and 0 when p + d is off the map
+        if dy == 0:
+            columns = range(width - 2, -1, -1) if dx > 0 else range(1, width)
+            for x in columns:
+                ahead = x + dx
+                steps[:, x] = 1 + np.where(blocked[:, ahead], 0, steps[:, ahead])
+        else:
+            rows = range(height - 2, -1, -1) if dy > 0 else range(1, height)
+            source = slice(max(dx, 0), width + min(dx, 0))
+            target = slice(max(-dx, 0), width + min(-dx, 0))
+            for y in rows:
+                ahead = y + dy
+                steps[y, target] = 1 + np.where(blocked[ahead, source], 0, steps[ahead, source])
+        return steps
+
+    def distance(self, position, direction):
+        """Number of cells from position to the first wall (inclusive) or the map edge."""
+        x, y = position
+        return int(self.steps[direction][y, x])
+
+    def distances(self, positions, direction):
+        """Vectorized distance() for an (N, 2) array of (x, y) positions."""
+        return self.steps[direction][positions[:, 1], positions[:, 0]]
+
+    def set_cell(self, position, value):
+        """Change one map cell and patch only the rays that pass through it."""
+        x, y = position
+        if self.map_data[y, x] == value:
+            return
+        self.map_data[y, x] = value
+
+        # A cell's own readings never depend on its value, only the readings of the cells
+        # behind it (up to the previous wall) do, so both fields of each pair can be patched
+        # from the values before the edit.
+        patches = []
+        for direction in DIRECTIONS:
+            dx, dy = direction
+            behind = self.steps[OPPOSITE[direction]][y, x]
+            if behind == 0:
+                continue
+            k = np.arange(1, behind + 1)
+            base = 0 if value == 0 else self.steps[direction][y, x]
+            patches.append((direction, y - k * dy, x - k * dx, k + base))
+        for direction, ys, xs, values in patches:
+            self.steps[direction][ys, xs] = values
+
+def distance_model(map_data):
+    """Sensor distance model for a map: precomputed tables for dense arrays, or the map itself
+    when it measures distances on its own (a TiledMap too large to precompute)."""
+    return map_data if hasattr(map_data, "distance") else DistanceField(map_data)
@@ -1,28 +1,53 @@
+import math
 import numpy as np
-import heapq
-from collections import defaultdict
+import logging
 import random
+from Coverage import CoverageGrid, PathStore, TiledCoverage
+from DistanceField import distance_model
+from HomeIndex import HomeIndex
+from Kinematics import CELL_SIZE, TIME_STEP
+from OccupancyGrid import FREE
+from Planner import RandomWalkPlanner
+
+BATTERY_PER_STEP = 10 / 480  # Battery percentage used per tick
+RETURN_BATTERY_LEVEL = 50  # Default battery percentage at which the drone heads home
+BATTERY_RESERVE = 5  # Spare battery percentage kept when turning back by distance
+FLIGHT_STATES = ["Taking off", "Flying", "Returning home", "Landing", "Landed"]
+
+logger = logging.getLogger(__name__)
 
 class Drone:
-    def __init__(self, start_position, map_data, far_point):
+    def __init__(self, start_position, map_data, far_point, distance_field=None, seed=None, return_battery_level=RETURN_BATTERY_LEVEL, planner=None, kinematics=None, belief_map=None):
         self.position = start_position
+        self.exact_position = (float(start_position[0]), float(start_position[1]))  # Continuous position in cells
         self.start_position = start_position
         self.map_data = map_data
+        self.distance_field = distance_field if distance_field is not None else distance_model(map_data)
         self.far_point = far_point
         self.battery_level = 100  # Start with full battery
-        self.covered_area = set()
-        self.path = [start_position]
+        self.covered_area = CoverageGrid(map_data.shape) if isinstance(map_data, np.ndarray) else TiledCoverage()
+        self.path = PathStore([start_position])
         self.time_elapsed = 0
         self.current_direction = (1, 0)  # Start moving right
         self.returning_home = False
         self.return_path = []
-        self.adjacency_list = defaultdict(list)
+        self.home_index = HomeIndex(start_position)
+        self.adjacency_list = self.home_index.adjacency
+        self.return_battery_level = return_battery_level  # None turns back by the real distance home
         self.yaw = 0
         self.pitch = 0
         self.roll = 0
-        self.velocity = (0, 0)  # (vx, vy)
+        self.velocity = (0, 0)  # (vx, vy) in cells/s
+        self.acceleration = (0, 0)  # (ax, ay) in cells/s^2
+        self.flow = (0, 0)  # Ground velocity over the last move in cells/s, what the optical-flow sensor sees
         self.altitude = 0
         self.flight_state = "Taking off"
+        self.rng = random.Random(seed)  # Own random stream so missions are reproducible
+        self.planner = planner if planner is not None else RandomWalkPlanner()
+        self.kinematics = kinematics  # Optional KinematicsModel, otherwise the drone hops one cell per tick
+        self.belief_map = belief_map  # Optional OccupancyGrid, the drone then only flies where it has sensed free space
+        self.estimated_position = self.exact_position  # Optical-flow odometry, kept up to date with a belief map
+        self._sensed_at = None  # Cell of the last ray-cast into the belief map
         
     def get_sensor_data(self):
         """Get sensor data for the drone."""
@@ -41,34 +66,45 @@ class Drone:
             'd3': distances['right'],
             'd4': distances['forward'],
             'yaw': self.yaw,
-            'Vx': self.velocity[0] * 0.025,  # Convert to m/s
-            'Vy': self.velocity[1] * 0.025,  # Convert to m/s
+            'Vx': self.flow[0] * CELL_SIZE,  # Convert to m/s
+            'Vy': self.flow[1] * CELL_SIZE,  # Convert to m/s
             'Z': self.altitude,
             'baro': self.altitude,
             'bat': self.battery_level,
             'pitch': self.pitch,
             'roll': self.roll,
-            'accX': self.velocity[0] * 10 * 0.025,  # Simulate acceleration data in m/s^2
-            'accY': self.velocity[1] * 10 * 0.025,  # Simulate acceleration data in m/s^2
+            'accX': self.acceleration[0] * CELL_SIZE,  # Convert to m/s^2
+            'accY': self.acceleration[1] * CELL_SIZE,  # Convert to m/s^2
             'accZ': 0   # Placeholder for vertical acceleration
         }
         return sensor_data
 
     def _distance_to_obstacle(self, position, direction):
         """Calculate the distance to the nearest obstacle in a given direction."""
-        x, y = position
-        dx, dy = direction
-        distance = 0
-        while 0 <= x + dx < self.map_data.shape[1] and 0 <= y + dy < self.map_data.shape[0]:
-            x += dx
-            y += dy
-            distance += 1
-            if self.map_data[y, x] == 0:
-                break
+        distance = self.distance_field.distance(position, direction)
         return max(0, distance * 0.025 - 0.1)  # Each pixel is 2.5 cm, convert to meters, minus drone radius
     
+    @property
+    def time_step(self):
+        """Seconds one move lasts."""
+        return self.kinematics.dt if self.kinematics is not None else TIME_STEP
+
     def move(self, direction):
         """Move the drone in the given direction."""
+        start_x, start_y = self.exact_position
+        if self.kinematics is not None:
+            self.kinematics.move(self, direction)
+        else:
+            self._hop(direction)
+        time_step = self.time_step
+        self.flow = ((self.exact_position[0] - start_x) / time_step, (self.exact_position[1] - start_y) / time_step)
+        if self.belief_map is not None:
+            readings = self.get_sensor_data()
+            self._localise(readings)
+            self.sense(readings)
+
+    def _hop(self, direction):
+        """Move one cell in the given direction, or in the first free one if that is blocked."""
         if direction is None:
             return
         
@@ -76,111 +112,136 @@ class Drone:
         dx, dy = direction
         new_position = (x + dx, y + dy)
         if self._is_valid_position(new_position):
-            self.position = new_position
-            self.covered_area.add(new_position)
-            self.path.append(new_position)
-            self._update_adjacency_list((x, y), new_position)
+            self._enter(new_position)
             self.update_orientation(direction)
             self.update_velocity(direction)
-            print(f"Moved to new position: {self.position}")
+            logger.debug("Moved to new position: %s", self.position)
         else:
-            print(f"Failed to move to new position: {new_position}, trying different directions")
+            logger.debug("Failed to move to new position: %s, trying different directions", new_position)
             possible_directions = [(1, 0), (0, 1), (-1, 0), (0, -1)]
             for d in possible_directions:
                 new_position = (x + d[0], y + d[1])
                 if self._is_valid_position(new_position):
-                    self.position = new_position
-                    self.covered_area.add(new_position)
-                    self.path.append(new_position)
-                    self._update_adjacency_list((x, y), new_position)
+                    self._enter(new_position)
                     self.current_direction = d
                     self.update_orientation(d)
                     self.update_velocity(d)
-                    print(f"Moved to new position: {self.position} after detecting obstacle")
+                    logger.debug("Moved to new position: %s after detecting obstacle", self.position)
                     break
+            else:
+                self.update_velocity((0, 0))  # Boxed in, hovering in place
     
+    def _localise(self, readings):
+        """Dead-reckon the estimated position from the optical-flow readings Vx, Vy of the last move.
+
+        The flow sensor reports the mean ground velocity over the move, without noise, so
+        integrating it over the tick keeps the estimate on the true position.
+        """
+        scale = self.time_step / CELL_SIZE  # m/s over one tick, in cells
+        x, y = self.estimated_position
+        self.estimated_position = (x + readings['Vx'] * scale, y + readings['Vy'] * scale)
+
+    def sense(self, readings=None):
+        """Ray-cast the ToF readings into the belief map from the estimated cell, once per cell."""
+        x, y = self.estimated_position
+        cell = (math.floor(x + 0.5), math.floor(y + 0.5))  # Rounded like KinematicsModel, halves up
+        if cell != self._sensed_at:
+            self.belief_map.integrate(cell, readings if readings is not None else self.get_sensor_data())
+            self._sensed_at = cell
+
+    def _enter(self, new_position):
+        """Make new_position the drone's cell, covering it and linking it into the home index."""
+        old_position = self.position
+        self.position = new_position
+        self.exact_position = (float(new_position[0]), float(new_position[1]))
+        self.covered_area.add(new_position)
+        self.path.append(new_position)
+        self._update_adjacency_list(old_position, new_position)
+
     def _update_adjacency_list(self, old_position, new_position):
-        """Update the adjacency list for the drone's path."""
-        self.adjacency_list[old_position].append(new_position)
-        self.adjacency_list[new_position].append(old_position)
+        """Update the adjacency list and the shortest paths home for the drone's path."""
+        known = self.home_index.distance
+        if new_position in known:
+            return  # Revisit: linked to every known neighbour (old_position too) on its first visit
+        self.home_index.add_edge(old_position, new_position)
+        # Covered neighbours are known to be free, so they are reachable from here as well
+        # (the home tree holds exactly the covered cells and home, and a dict lookup is cheaper)
+        x, y = new_position
+        for dx, dy in ((1, 0), (0, 1), (-1, 0), (0, -1)):
+            neighbour = (x + dx, y + dy)
+            if neighbour in known and neighbour != old_position:
+                self.home_index.add_edge(new_position, neighbour)
     
     def _is_valid_position(self, position):
-        """Check if a position is valid (i.e., within bounds and not an obstacle)."""
+        """Check if a position is valid (i.e., within bounds and not an obstacle).
+
+        With a belief map, only cells the drone has sensed as free count.
+        """
         x, y = position
-        valid = 0 <= x < self.map_data.shape[1] and 0 <= y < self.map_data.shape[0] and self.map_data[y, x] == 1
-        print(f"Position {position} is {'valid' if valid else 'invalid'}")
+        if self.belief_map is not None:
+            valid = 0 <= x < self.map_data.shape[1] and 0 <= y < self.map_data.shape[0] and self.belief_map.state(position) == FREE
+        else:
+            valid = 0 <= x < self.map_data.shape[1] and 0 <= y < self.map_data.shape[0] and self.map_data[y, x] == 1
+        logger.debug("Position %s is %s", position, "valid" if valid else "invalid")
         return valid
     
     def update_battery(self, time_step=1):
         """Update the battery level based on time step."""
-        self.battery_level -= (10 / 480) * time_step
-        print(f"Battery updated: {self.battery_level:.2f}%")
+        self.battery_level -= BATTERY_PER_STEP * time_step
+        logger.debug("Battery updated: %.2f%%", self.battery_level)
     
     def plan_next_move(self):
-        """Plan the next move based on the current state and battery level."""
-        x, y = self.position
-        print(f"Current position: {self.position}, Battery: {self.battery_level:.2f}%")
-        
-        unvisited_adjacent = []
-        for direction in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-            next_position = (x + direction[0], y + direction[1])
-            if self._is_valid_position(next_position) and next_position not in self.covered_area:
-                unvisited_adjacent.append(direction)
-        
-        if unvisited_adjacent:
-            next_move = random.choice(unvisited_adjacent)
-            print(f"Unvisited adjacent: {unvisited_adjacent}, Next move: {next_move}")
-            return next_move
-        
-        print(f"Continuing in current direction: {self.current_direction}")
-        return self.current_direction
+        """Plan the next move with the drone's exploration planner."""
+        logger.debug("Current position: %s, Battery: %.2f%%", self.position, self.battery_level)
+        return self.planner.next_move(self)
+
+    def should_return_home(self):
+        """Decide whether it is time to turn back home."""
+        if self.return_battery_level is not None:
+            return self.battery_level <= self.return_battery_level
+
+        distance = self.home_index.distance_home(self.position)
+        if distance is None:
+            return True
+        # One more step out, then the return path (which starts at the current position)
+        needed = (distance + 2) * BATTERY_PER_STEP + BATTERY_RESERVE
+        return self.battery_level <= needed
 
     def start_returning_home(self):
-        """Start returning home using Dijkstra's algorithm."""
+        """Start returning home along the shortest known path."""
         self.returning_home = True
-        self.return_path = self.dijkstra(self.position, self.start_position)
-        print("Starting to return home, path:", self.return_path)
+        self.return_path = self.home_index.path_home(self.position)
+        logger.info("Starting to return home, %d steps away", len(self.return_path))
+        logger.debug("Return path: %s", self.return_path)
     
     def return_home(self):
         """Return home following the calculated path."""
+        if self.kinematics is not None:
+            return self._steer_home()
         if not self.return_path:
-            print("Reached home or no valid path")
+            logger.info("Reached home or no valid path")
             return None
         
         next_position = self.return_path.pop(0)
         move = (next_position[0] - self.position[0], next_position[1] - self.position[1])
-        print(f"Returning home, next move: {move}")
+        logger.debug("Returning home, next move: %s", move)
         return move
     
-    def dijkstra(self, start, goal):
-        """Dijkstra's algorithm to find the shortest path to the goal."""
-        queue = [(0, start)]
-        distances = {start: 0}
-        previous_nodes = {start: None}
-
-        while queue:
-            current_distance, current_node = heapq.heappop(queue)
-
-            if current_node == goal:
-                break
-
-            for neighbor in self.adjacency_list[current_node]:
-                distance = current_distance + 1
-                if neighbor not in distances or distance < distances[neighbor]:
-                    distances[neighbor] = distance
-                    priority = distance
-                    heapq.heappush(queue, (priority, neighbor))
-                    previous_nodes[neighbor] = current_node
-
-        path = []
-        current = goal
-        while current is not None:
-            path.append(current)
-            current = previous_nodes[current]
-
-        path.reverse()
-        print(f"Path found: {path}")
-        return path if path[0] == start else []
+    def _steer_home(self):
+        """Direction home from wherever momentum has carried the drone, or None once it hovers at home.
+
+        Within a cell of home the drone brakes to a stop before it moves on, so that it
+        cannot keep overshooting home and circling back.
+        """
+        self.return_path = self.home_index.path_home(self.position)
+        near_home = max(abs(self.position[0] - self.start_position[0]), abs(self.position[1] - self.start_position[1])) <= 1
+        if self.return_path and near_home and not self.kinematics.stopped(self):
+            return (0, 0)  # Brake
+        if len(self.return_path) > 1:
+            next_position = self.return_path[1]
+            return (next_position[0] - self.position[0], next_position[1] - self.position[1])
+        logger.info("Reached home or no valid path")
+        return None
 
     def update_orientation(self, direction):
         """Update the drone's orientation based on its direction."""
@@ -194,22 +255,25 @@ class Drone:
         elif dy < 0:
             self.yaw = -90
         
-        self.pitch = (self.velocity[0] / 3) * 10  # Simulate pitch based on velocity, max speed 3 m/s
-        self.roll = (self.velocity[1] / 3) * 10   # Simulate roll based on velocity, max speed 3 m/s
+        self.pitch = (self.velocity[0] * CELL_SIZE / 3) * 10  # Simulate pitch based on velocity, max speed 3 m/s
+        self.roll = (self.velocity[1] * CELL_SIZE / 3) * 10   # Simulate roll based on velocity, max speed 3 m/s
 
     def update_velocity(self, direction):
         """Update the drone's velocity based on its direction."""
         dx, dy = direction
-        self.velocity = (dx, dy)
+        self.velocity = (dx / TIME_STEP, dy / TIME_STEP)  # One cell per tick
+        self.acceleration = (dx / TIME_STEP ** 2, dy / TIME_STEP ** 2)  # Simulated, as if reached within one tick
 
     def takeoff(self):
         """Simulate the drone takeoff."""
         if self.altitude == 0:
             self.altitude = 1  # Takeoff to a height of 1 meter
-            print("Taking off to a height of 1 meter")
+            logger.info("Taking off to a height of 1 meter")
+            if self.belief_map is not None:
+                self.sense()  # First look around before moving
 
     def land(self):
         """Simulate the drone landing."""
         if self.altitude > 0:
             self.altitude = 0  # Land the drone
-            print("Landing the drone")
+            logger.info("Landing the drone")
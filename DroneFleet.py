@@ -0,0 +1,244 @@
+import numpy as np
+from DistanceField import DistanceField, DIRECTIONS
+from Drone import BATTERY_PER_STEP, RETURN_BATTERY_LEVEL, FLIGHT_STATES
+from SimulationEngine import TIME_STEP
+
+# Flight states are stored as their index in FLIGHT_STATES
+TAKING_OFF, FLYING, RETURNING_HOME, LANDING, LANDED = range(5)
+
+PLAN_DIRECTIONS = np.array([(0, 1), (0, -1), (1, 0), (-1, 0)])  # Same order as Drone.plan_next_move
+FALLBACK_DIRECTIONS = np.array([(1, 0), (0, 1), (-1, 0), (0, -1)])  # Same order as Drone.move
+RETURN_SEARCH_CELLS = 2 ** 25  # Cell budget for one batch of return-home searches
+
+class DroneFleet:
+    """N drones on the same map, stored as struct-of-arrays and stepped together."""
+    def __init__(self, map_data, start_positions, far_points=None, seed=None, distance_field=None):
+        self.map_data = map_data
+        self.free = map_data == 1
+        self.height, self.width = map_data.shape
+        self.distance_field = distance_field if distance_field is not None else DistanceField(map_data)
+        self.rng = np.random.default_rng(seed)
+
+        self.start_positions = np.array(start_positions, dtype=np.int64).reshape(-1, 2)
+        self.far_points = None if far_points is None else np.array(far_points, dtype=np.int64).reshape(-1, 2)
+        self.size = n = len(self.start_positions)
+
+        # Per-drone state, one row per drone, positions and directions are (x, y)
+        self.positions = self.start_positions.copy()
+        self.velocities = np.zeros((n, 2), dtype=np.int64)
+        self.current_directions = np.tile(np.array([1, 0], dtype=np.int64), (n, 1))
+        self.battery_levels = np.full(n, 100.0)
+        self.time_elapsed = np.zeros(n)
+        self.yaw = np.zeros(n)
+        self.pitch = np.zeros(n)
+        self.roll = np.zeros(n)
+        self.altitudes = np.zeros(n)
+        self.flight_states = np.full(n, TAKING_OFF, dtype=np.uint8)
+        self.steps = 0
+
+        # Covered cells as one packed bitset per drone, bit y * width + x (little bit order)
+        self.covered = np.zeros((n, (self.height * self.width + 7) // 8), dtype=np.uint8)
+        self.coverage = np.zeros(n, dtype=np.int64)
+
+        # Return paths of all drones, flattened into one buffer
+        self.return_buffer = np.zeros((0, 2), dtype=np.int64)
+        self.return_offsets = np.zeros(n, dtype=np.int64)
+        self.return_lengths = np.zeros(n, dtype=np.int64)
+        self.return_index = np.zeros(n, dtype=np.int64)
+
+    @property
+    def finished(self):
+        """Whether every drone in the fleet has landed."""
+        return bool(np.all(self.flight_states == LANDED))
+
+    def flight_state_names(self):
+        """Flight state of every drone as the names Drone uses."""
+        return [FLIGHT_STATES[state] for state in self.flight_states]
+
+    def step(self):
+        """Advance every drone by one tick of the mission state machine."""
+        states = self.flight_states
+        taking_off = np.flatnonzero(states == TAKING_OFF)
+        flying = states == FLYING
+        exploring = np.flatnonzero(flying & (self.battery_levels > RETURN_BATTERY_LEVEL))
+        turning_back = np.flatnonzero(flying & (self.battery_levels <= RETURN_BATTERY_LEVEL))
+        returning = np.flatnonzero(states == RETURNING_HOME)
+        landing = np.flatnonzero(states == LANDING)
+
+        self.altitudes[taking_off] = 1
+        states[taking_off] = FLYING
+
+        if len(exploring):
+            self._move(exploring, self.plan_next_move(exploring))
+            self._tick(exploring)
+
+        if len(turning_back):
+            self.start_returning_home(turning_back)
+            states[turning_back] = RETURNING_HOME
+
+        if len(returning):
+            arrived = self.return_index[returning] >= self.return_lengths[returning]
+            states[returning[arrived]] = LANDING
+            moving = returning[~arrived]
+            waypoints = self.return_buffer[self.return_offsets[moving] + self.return_index[moving]]
+            self.return_index[moving] += 1
+            self._move(moving, waypoints - self.positions[moving])
+            self._tick(moving)
+
+        self.altitudes[landing] = 0
+        states[landing] = LANDED
+
+        self.steps += 1
+
+    def run(self, max_steps=None):
+        """Step until every drone has landed (or max_steps ticks have run)."""
+        while not self.finished and (max_steps is None or self.steps < max_steps):
+            self.step()
+        return self
+
+    def _tick(self, drones):
+        """Drain the battery and advance the clock of the given drones."""
+        self.battery_levels[drones] -= BATTERY_PER_STEP
+        self.time_elapsed[drones] += TIME_STEP
+
+    def _is_valid_position(self, cells):
+        """Which (..., 2) cells are inside the map and free."""
+        x, y = cells[..., 0], cells[..., 1]
+        inside = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+        return inside & self.free[np.where(inside, y, 0), np.where(inside, x, 0)]
+
+    def _is_covered(self, drones, cells):
+        """Which cells (one row per drone, any trailing shape) the drones have covered."""
+        x = np.clip(cells[..., 0], 0, self.width - 1)
+        y = np.clip(cells[..., 1], 0, self.height - 1)
+        bits = y * self.width + x
+        rows = drones.reshape((-1,) + (1,) * (bits.ndim - 1))
+        return (self.covered[rows, bits >> 3] >> (bits & 7)) & 1 == 1
+
+    def _cover(self, drones, cells):
+        """Mark one cell per drone as covered."""
+        bits = cells[:, 1] * self.width + cells[:, 0]
+        new = ~self._is_covered(drones, cells)
+        self.covered[drones, bits >> 3] |= (1 << (bits & 7)).astype(np.uint8)
+        self.coverage[drones] += new
+
+    def plan_next_move(self, drones):
+        """Pick a random unvisited free neighbour per drone, or keep the current direction."""
+        candidates = self.positions[drones, None, :] + PLAN_DIRECTIONS
+        unvisited = self._is_valid_position(candidates) & ~self._is_covered(drones, candidates)
+        scores = np.where(unvisited, self.rng.random(unvisited.shape), -1.0)
+        choice = PLAN_DIRECTIONS[np.argmax(scores, axis=1)]
+        return np.where(unvisited.any(axis=1)[:, None], choice, self.current_directions[drones])
+
+    def _move(self, drones, directions):
+        """Move each drone in its direction, falling back to the first free neighbour when blocked."""
+        positions = self.positions[drones]
+        direct = self._is_valid_position(positions + directions)
+
+        fallback_valid = self._is_valid_position(positions[:, None, :] + FALLBACK_DIRECTIONS)
+        fallback = FALLBACK_DIRECTIONS[np.argmax(fallback_valid, axis=1)]
+        can_fall_back = ~direct & fallback_valid.any(axis=1)
+        self.current_directions[drones[can_fall_back]] = fallback[can_fall_back]
+
+        moved = direct | can_fall_back
+        self.velocities[drones[~moved]] = 0  # Boxed in, hovering in place like Drone
+        drones = drones[moved]
+        directions = np.where(direct[:, None], directions, fallback)[moved]
+        new_positions = positions[moved] + directions
+
+        self.positions[drones] = new_positions
+        self._cover(drones, new_positions)
+        self.update_orientation(drones, directions)
+        self.velocities[drones] = directions
+
+    def update_orientation(self, drones, directions):
+        """Update yaw from the move direction and pitch/roll from the current velocity."""
+        dx, dy = directions[:, 0], directions[:, 1]
+        yaw = self.yaw[drones]
+        yaw = np.where(dy < 0, -90, yaw)
+        yaw = np.where(dy > 0, 90, yaw)
+        yaw = np.where(dx < 0, 180, yaw)
+        yaw = np.where(dx > 0, 0, yaw)
+        self.yaw[drones] = yaw
+        speeds = self.velocities[drones] * 0.025 / TIME_STEP  # One cell per tick, in m/s
+        self.pitch[drones] = (speeds[:, 0] / 3) * 10  # Simulate pitch based on velocity, max speed 3 m/s
+        self.roll[drones] = (speeds[:, 1] / 3) * 10   # Simulate roll based on velocity, max speed 3 m/s
+
+    def get_sensor_data(self):
+        """Sensor readings of every drone, with the same keys as Drone.get_sensor_data."""
+        distances = [np.maximum(0, self.distance_field.distances(self.positions, direction) * 0.025 - 0.1) for direction in DIRECTIONS]
+        return {
+            'd0': distances[0],
+            'd1': distances[1],
+            'd2': distances[2],
+            'd3': distances[3],
+            'd4': distances[4],
+            'yaw': self.yaw.copy(),
+            'Vx': self.velocities[:, 0] * 0.025 / TIME_STEP,
+            'Vy': self.velocities[:, 1] * 0.025 / TIME_STEP,
+            'Z': self.altitudes.copy(),
+            'baro': self.altitudes.copy(),
+            'bat': self.battery_levels.copy(),
+            'pitch': self.pitch.copy(),
+            'roll': self.roll.copy(),
+            'accX': self.velocities[:, 0] * 0.025 / TIME_STEP ** 2,
+            'accY': self.velocities[:, 1] * 0.025 / TIME_STEP ** 2,
+            'accZ': np.zeros(self.size)
+        }
+
+    def start_returning_home(self, drones):
+        """Compute the shortest route home over each drone's covered cells."""
+        batch = max(1, RETURN_SEARCH_CELLS // (self.height * self.width))
+        for first in range(0, len(drones), batch):
+            self._plan_return_paths(drones[first:first + batch])
+
+    def _plan_return_paths(self, drones):
+        """Breadth-first search from home over covered cells, then walk back downhill."""
+        count = len(drones)
+        rows = np.arange(count)
+        cells = self.height * self.width
+        walkable = np.unpackbits(self.covered[drones], axis=1, count=cells, bitorder='little').astype(bool)
+        homes = self.start_positions[drones]
+        positions = self.positions[drones]
+        home_cells = rows * cells + homes[:, 1] * self.width + homes[:, 0]
+        targets = rows * cells + positions[:, 1] * self.width + positions[:, 0]
+        walkable = walkable.reshape(-1)
+        walkable[home_cells] = True
+        walkable[targets] = True
+
+        # Search all drones of the batch at once over flat (drone, cell) indices, one level at a time
+        distance = np.full(count * cells, -1, dtype=np.int32)
+        distance[home_cells] = 0
+        wave = home_cells
+        level = 0
+        while len(wave) and np.any(distance[targets] < 0):
+            cell = wave % cells
+            x, y = cell % self.width, cell // self.width
+            grown = np.concatenate([wave[y > 0] - self.width, wave[y < self.height - 1] + self.width,
+                                    wave[x > 0] - 1, wave[x < self.width - 1] + 1])
+            wave = np.unique(grown[walkable[grown] & (distance[grown] < 0)])
+            level += 1
+            distance[wave] = level
+        distance = distance.reshape(count, self.height, self.width)
+
+        # Paths run from the current position to home, both included, like Drone.start_returning_home
+        lengths = distance[rows, positions[:, 1], positions[:, 0]] + 1
+        longest = max(int(lengths.max()), 1)
+        paths = np.zeros((count, longest, 2), dtype=np.int64)
+        paths[:, 0] = current = positions.copy()
+        for t in range(1, longest):
+            here = distance[rows, current[:, 1], current[:, 0]]
+            neighbours = current[:, None, :] + FALLBACK_DIRECTIONS
+            inside = self._is_valid_position(neighbours)
+            x = np.clip(neighbours[..., 0], 0, self.width - 1)
+            y = np.clip(neighbours[..., 1], 0, self.height - 1)
+            downhill = inside & (distance[rows[:, None], y, x] == here[:, None] - 1) & (here[:, None] > 0)
+            step_to = neighbours[rows, np.argmax(downhill, axis=1)]
+            current = np.where(downhill.any(axis=1)[:, None], step_to, current)
+            paths[:, t] = current
+
+        keep = np.arange(longest) < lengths[:, None]
+        self.return_offsets[drones] = len(self.return_buffer) + np.cumsum(lengths) - lengths
+        self.return_lengths[drones] = lengths
+        self.return_index[drones] = 0
+        self.return_buffer = np.concatenate([self.return_buffer, paths[keep]])
@@ -1,14 +1,27 @@
+import os
 import pygame
+import numpy as np
 import time
-from Drone import Drone
+from Replay import ReplayDrone
+from SimulationEngine import SimulationEngine
 
 class DroneSimulator:
-    def __init__(self, map_data, start_position, far_point):
+    def __init__(self, map_data, start_position, far_point, engine=None, start=True, fps=10, replay=None, speed=1):
         pygame.init()
         self.map_data = map_data
         self.start_position = start_position
         self.far_point = far_point
-        self.drone = Drone(start_position, map_data, far_point)
+        if replay is not None:
+            # Playback of a FlightLog instead of a live mission
+            self.engine = None
+            self.drone = ReplayDrone(replay, start_position)
+        else:
+            self.engine = engine if engine is not None else SimulationEngine(map_data, start_position, far_point)
+            self.drone = self.engine.drone
+        self.replay = replay
+        self.speed = speed  # Playback speed, in flight seconds per second
+        self.paused = False
+        self.playback_anchor = (0.0, 0.0)  # (wall clock, flight time) that playback advances from
         self.sidebar_width = 500  # Width of the sidebar for data display
         self.screen_info = pygame.display.Info()
         self.screen_width = self.screen_info.current_w
@@ -26,101 +39,155 @@ class DroneSimulator:
         
         self.running = True
         self.clock = pygame.time.Clock()
+        self.fps = fps
         self.fullscreen = False
 
+        # Cached layers, built on the first frame and after every resize
+        self.map_surface = None  # Static map with the start and far points
+        self.trail_surface = None  # Path drawn so far, extended incrementally
+        self.trail_length = 0  # Number of path points already on the trail layer
+        self.drone_rects = []  # Screen areas covered by the drone sprite and label last frame
+        self.dirty_rects = []  # Screen areas changed this frame
+
         # Load the drone image
-        self.drone_image = pygame.image.load("drone_2646511.png").convert_alpha()
+        self.drone_image = pygame.image.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), "drone_2646511.png")).convert_alpha()
         self.drone_image = pygame.transform.scale(self.drone_image, (self.cell_size * 4, self.cell_size * 4))
         
-        self.update_simulation()
+        if start:
+            if replay is not None:
+                self.play()
+            else:
+                self.update_simulation()
     
+    def build_layers(self):
+        """Pre-render the static map and an empty trail layer at the current cell size."""
+        free = np.where(self.map_data[:, :] == 1, 255, 0).astype(np.uint8).T
+        cells = pygame.surfarray.make_surface(np.dstack((free, free, free)))
+        map_size = (self.map_data.shape[1] * self.cell_size, self.map_data.shape[0] * self.cell_size)
+        self.map_surface = pygame.transform.scale(cells, map_size)
+        self.draw_start_and_end_points()
+        self.trail_surface = pygame.Surface(map_size, pygame.SRCALPHA)
+        self.trail_length = 0
+        self.drone_rects = []
+
     def draw_map(self):
-        """Draw the map."""
-        for y in range(self.map_data.shape[0]):
-            for x in range(self.map_data.shape[1]):
-                color = (255, 255, 255) if self.map_data[y, x] == 1 else (0, 0, 0)
-                pygame.draw.rect(self.screen, color, pygame.Rect(x * self.cell_size + self.sidebar_width, y * self.cell_size, self.cell_size, self.cell_size))
+        """Draw the cached map and trail layers."""
+        self.screen.blit(self.map_surface, (self.sidebar_width, 0))
+        self.screen.blit(self.trail_surface, (self.sidebar_width, 0))
+        self.dirty_rects.append(pygame.Rect((self.sidebar_width, 0), self.map_surface.get_size()))
+
+    def restore_map(self, rect):
+        """Redraw the map and trail under a screen rectangle."""
+        rect = rect.clip(pygame.Rect((self.sidebar_width, 0), self.map_surface.get_size()))
+        area = rect.move(-self.sidebar_width, 0)
+        self.screen.blit(self.map_surface, rect, area)
+        self.screen.blit(self.trail_surface, rect, area)
+        self.dirty_rects.append(rect)
     
     def draw_start_and_end_points(self):
-        """Draw the start and end points."""
+        """Draw the start and end points onto the map layer."""
         start_x, start_y = self.start_position
-        pygame.draw.circle(self.screen, (0, 255, 0), (start_x * self.cell_size + self.cell_size // 2 + self.sidebar_width, start_y * self.cell_size + self.cell_size // 2), self.cell_size)
+        pygame.draw.circle(self.map_surface, (0, 255, 0), (start_x * self.cell_size + self.cell_size // 2, start_y * self.cell_size + self.cell_size // 2), self.cell_size)
         
         far_x, far_y = self.far_point
-        pygame.draw.circle(self.screen, (255, 0, 0), (far_x * self.cell_size + self.cell_size // 2 + self.sidebar_width, far_y * self.cell_size + self.cell_size // 2), self.cell_size)
+        pygame.draw.circle(self.map_surface, (255, 0, 0), (far_x * self.cell_size + self.cell_size // 2, far_y * self.cell_size + self.cell_size // 2), self.cell_size)
     
-    def update_simulation(self):
-        """Update the simulation."""
-        takeoff_displayed = False
-        landing_displayed = False
-
-        while self.running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
+    def handle_events(self):
+        """Handle window, keyboard and mouse events."""
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif event.type == pygame.VIDEORESIZE:
+                self.screen_width, self.screen_height = event.size
+                self.cell_size = min(self.screen_height // self.map_data.shape[0], self.screen_width // (self.map_data.shape[1] + self.sidebar_width // 10))
+                self.screen_size = (self.screen_width, self.screen_height)
+                self.screen = pygame.display.set_mode(self.screen_size, pygame.RESIZABLE)
+                self.map_surface = None
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_f:
+                    self.fullscreen = not self.fullscreen
+                    if self.fullscreen:
+                        self.screen = pygame.display.set_mode(self.screen_size, pygame.FULLSCREEN)
+                    else:
+                        self.screen = pygame.display.set_mode(self.screen_size, pygame.RESIZABLE)
+                    self.map_surface = None
+                elif event.key == pygame.K_ESCAPE:
+                    self.running = False
+                elif self.replay is not None:
+                    self.handle_playback_key(event.key)
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if self.exit_button.collidepoint(event.pos):
                     self.running = False
-                elif event.type == pygame.VIDEORESIZE:
-                    self.screen_width, self.screen_height = event.size
-                    self.cell_size = min(self.screen_height // self.map_data.shape[0], self.screen_width // (self.map_data.shape[1] + self.sidebar_width // 10))
-                    self.screen_size = (self.screen_width, self.screen_height)
-                    self.screen = pygame.display.set_mode(self.screen_size, pygame.RESIZABLE)
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_f:
-                        self.fullscreen = not self.fullscreen
-                        if self.fullscreen:
-                            self.screen = pygame.display.set_mode(self.screen_size, pygame.FULLSCREEN)
-                        else:
-                            self.screen = pygame.display.set_mode(self.screen_size, pygame.RESIZABLE)
-                    elif event.key == pygame.K_ESCAPE:
-                        self.running = False
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    if self.exit_button.collidepoint(event.pos):
-                        self.running = False
-            
-            self.screen.fill((255, 255, 255))
+
+    def render_frame(self):
+        """Draw the current simulation state, pushing only the changed areas to the display."""
+        self.dirty_rects = []
+        if self.map_surface is None:
+            self.build_layers()
+            self.dirty_rects.append(self.screen.fill((255, 255, 255)))
             self.draw_map()
-            self.draw_start_and_end_points()
-            
-            if self.drone.flight_state == "Taking off" and not takeoff_displayed:
-                self.draw_drone()
-                self.draw_info()
-                pygame.display.flip()
-                time.sleep(2)
-                takeoff_displayed = True
-                self.drone.takeoff()
-                self.drone.flight_state = "Flying"
-            elif self.drone.battery_level > 50 and self.drone.flight_state == "Flying":
-                move = self.drone.plan_next_move()
-                self.drone.move(move)
-                self.drone.update_battery()
-                self.drone.time_elapsed += 0.1
-            elif self.drone.battery_level <= 50 and self.drone.flight_state == "Flying":
-                self.drone.start_returning_home()
-                self.drone.flight_state = "Returning home"
-            elif self.drone.flight_state == "Returning home":
-                move = self.drone.return_home()
-                if move is None:
-                    self.drone.flight_state = "Landing"
-                else:
-                    self.drone.move(move)
-                    self.drone.update_battery()
-                    self.drone.time_elapsed += 0.1
-            elif self.drone.flight_state == "Landing" and not landing_displayed:
-                self.draw_drone()
-                self.draw_info()
-                pygame.display.flip()
+        else:
+            for rect in self.drone_rects:
+                self.restore_map(rect)
+        self.draw_drone()
+        self.draw_info()
+        pygame.display.update(self.dirty_rects)
+
+    def update_simulation(self):
+        """Run the simulation engine with the viewer attached."""
+        while self.running:
+            self.handle_events()
+
+            if self.drone.flight_state in ("Taking off", "Landing"):
+                # Hold the takeoff and landing frames on screen for a moment
+                self.render_frame()
                 time.sleep(2)
-                landing_displayed = True
-                self.drone.land()
-                self.drone.flight_state = "Landed"
-            
-            self.draw_drone()
-            self.draw_info()
-            pygame.display.flip()
-            self.clock.tick(10)
+
+            if not self.engine.finished:
+                self.engine.step()
+
+            self.render_frame()
+            self.clock.tick(self.fps)
     
+    def play(self):
+        """Play back the replay, skipping whatever recorded steps fall between two frames."""
+        self.seek(-1)
+        while self.running:
+            self.handle_events()
+            if not self.paused:
+                wall, flight_time = self.playback_anchor
+                target = flight_time + (time.perf_counter() - wall) * self.speed
+                index = self.replay.index_at_time(target)
+                if index > self.drone.index:
+                    self.drone.seek(index)
+            self.render_frame()
+            self.clock.tick(self.fps)
+
+    def seek(self, index):
+        """Jump the replay to a record index, rebuilding the trail when going backwards."""
+        if index < self.drone.index:
+            self.map_surface = None  # The trail layer only grows, redraw it from the start
+        self.drone.seek(index)
+        self.playback_anchor = (time.perf_counter(), self.drone.time_elapsed)
+
+    def handle_playback_key(self, key):
+        """Space pauses, left/right seek 10 flight seconds, up/down double or halve the speed, Home restarts."""
+        if key == pygame.K_SPACE:
+            self.paused = not self.paused
+            self.seek(self.drone.index)
+        elif key in (pygame.K_LEFT, pygame.K_RIGHT):
+            offset = 10 if key == pygame.K_RIGHT else -10
+            self.seek(self.replay.index_at_time(self.drone.time_elapsed + offset))
+        elif key in (pygame.K_UP, pygame.K_DOWN):
+            self.speed = self.speed * 2 if key == pygame.K_UP else self.speed / 2
+            self.seek(self.drone.index)
+        elif key == pygame.K_HOME:
+            self.seek(-1)
+
     def draw_info(self):
         """Draw the sidebar information."""
-        pygame.draw.rect(self.screen, (204, 255, 255), pygame.Rect(0, 0, self.sidebar_width, self.screen.get_height()))
+        sidebar = pygame.draw.rect(self.screen, (204, 255, 255), pygame.Rect(0, 0, self.sidebar_width, self.screen.get_height()))
+        self.dirty_rects.append(sidebar)
         
         battery_text = self.font.render(f"Battery: {self.drone.battery_level:.2f}%", True, (0, 0, 0))
         time_text = self.font.render(f"Flight Time: {self.drone.time_elapsed:.2f} sec", True, (0, 0, 0))
@@ -167,27 +234,30 @@ class DroneSimulator:
         self.screen.blit(optical_flow_text, optical_flow_text_rect)
     
     def draw_drone(self):
-        """Draw the drone and its path."""
+        """Draw the drone and the new part of its path."""
         x, y = self.drone.position
 
-        # Draw the path first
-        for (tx, ty) in self.drone.path:
-            pygame.draw.circle(self.screen, (255, 0, 0), (tx * self.cell_size + self.cell_size // 2 + self.sidebar_width, ty * self.cell_size + self.cell_size // 2),
-                               self.cell_size // 2)
+        # Extend the trail layer with the points added since the last frame
+        for (tx, ty) in self.drone.path[self.trail_length:]:
+            center = (tx * self.cell_size + self.cell_size // 2, ty * self.cell_size + self.cell_size // 2)
+            trail_rect = pygame.draw.circle(self.trail_surface, (255, 0, 0), center, self.cell_size // 2)
+            self.restore_map(trail_rect.move(self.sidebar_width, 0))
+        self.trail_length = len(self.drone.path)
 
         # Calculate the position to center the image on the cell
         drone_rect = self.drone_image.get_rect(center=(x * self.cell_size + self.sidebar_width + self.cell_size // 2, y * self.cell_size + self.cell_size // 2))
-        self.screen.blit(self.drone_image, drone_rect)
+        self.drone_rects = [self.screen.blit(self.drone_image, drone_rect)]
 
         if self.drone.flight_state == "Taking off":
             takeoff_text = self.font.render("Taking Off", True, (0, 255, 0))
-            self.screen.blit(takeoff_text, (x * self.cell_size + self.cell_size // 2 + self.sidebar_width - 20, y * self.cell_size + self.cell_size // 2 - 20))
+            self.drone_rects.append(self.screen.blit(takeoff_text, (x * self.cell_size + self.cell_size // 2 + self.sidebar_width - 20, y * self.cell_size + self.cell_size // 2 - 20)))
         elif self.drone.flight_state == "Flying" or self.drone.flight_state == "Returning home":
             flying_text = self.font.render("Flying", True, (0, 0, 255))
-            self.screen.blit(flying_text, (x * self.cell_size + self.cell_size // 2 + self.sidebar_width - 20, y * self.cell_size + self.cell_size // 2 - 20))
+            self.drone_rects.append(self.screen.blit(flying_text, (x * self.cell_size + self.cell_size // 2 + self.sidebar_width - 20, y * self.cell_size + self.cell_size // 2 - 20)))
         elif self.drone.flight_state == "Landing":
             landing_text = self.font.render("Landing", True, (255, 0, 0))
-            self.screen.blit(landing_text, (x * self.cell_size + self.cell_size // 2 + self.sidebar_width - 20, y * self.cell_size + self.cell_size // 2 - 20))
+            self.drone_rects.append(self.screen.blit(landing_text, (x * self.cell_size + self.cell_size // 2 + self.sidebar_width - 20, y * self.cell_size + self.cell_size // 2 - 20)))
         elif self.drone.flight_state == "Landed":
             landed_text = self.font.render("Landed Safely", True, (0, 255, 0))
-            self.screen.blit(landed_text, (x * self.cell_size + self.cell_size // 2 + self.sidebar_width - 40, y * self.cell_size + self.cell_size // 2 - 20))
+            self.drone_rects.append(self.screen.blit(landed_text, (x * self.cell_size + self.cell_size // 2 + self.sidebar_width - 40, y * self.cell_size + self.cell_size // 2 - 20)))
+        self.dirty_rects.extend(self.drone_rects)
@@ -0,0 +1,67 @@
+from collections import defaultdict, deque
+
+class HomeIndex:
+    """Deduplicated breadcrumb graph with a breadth-first tree rooted at home, kept current on every edge."""
+    def __init__(self, home):
+        self.home = home
+        self.adjacency = defaultdict(frozenset)  # Immutable neighbour sets, so copies can share them
+        self.distance = {home: 0}
+        self.parent = {home: None}
+
+    def add_edge(self, a, b):
+        """Add an undirected edge and relax the tree from whichever end got closer to home."""
+        adjacency = self.adjacency
+        if a == b or b in adjacency[a]:
+            return
+        adjacency[a] = adjacency[a] | {b}
+        adjacency[b] = adjacency[b] | {a}
+
+        # At most one end can improve through the other (a step each way cannot shorten both)
+        distance = self.distance
+        distance_a, distance_b = distance.get(a), distance.get(b)
+        if distance_a is not None and (distance_b is None or distance_a + 1 < distance_b):
+            u, v = a, b
+        elif distance_b is not None and (distance_a is None or distance_b + 1 < distance_a):
+            u, v = b, a
+        else:
+            return
+        distance[v] = distance[u] + 1
+        self.parent[v] = u
+        if len(adjacency[v]) == 1:
+            return  # A new leaf, there is nothing behind it to relax
+
+        # Edges are only ever added, so distances only shrink: a BFS from the improved nodes
+        # touches just the part of the tree that actually moves closer to home. Neighbours are
+        # relaxed in sorted order, not set order, so that ties pick the same parent however the
+        # sets were built (a restored snapshot rebuilds them in another order).
+        queue = deque((v,))
+        while queue:
+            u = queue.popleft()
+            through_u = distance[u] + 1
+            for v in sorted(adjacency[u]):
+                if through_u < distance.get(v, through_u + 1):
+                    distance[v] = through_u
+                    self.parent[v] = u
+                    queue.append(v)
+
+    def copy(self):
+        """Independent copy, made of shallow dict copies only."""
+        twin = HomeIndex(self.home)
+        twin.adjacency = defaultdict(frozenset, self.adjacency)
+        twin.distance = dict(self.distance)
+        twin.parent = dict(self.parent)
+        return twin
+
+    def distance_home(self, position):
+        """Number of moves from position back home, or None if it is not connected."""
+        return self.distance.get(position)
+
+    def path_home(self, position):
+        """Shortest path from position to home, both included, or [] if it is not connected."""
+        if position not in self.parent:
+            return []
+        path = []
+        while position is not None:
+            path.append(position)
+            position = self.parent[position]
+        return path
@@ -0,0 +1,220 @@
+import math
+from DistanceField import DIRECTIONS
+
+CELL_SIZE = 0.025  # Metres per map cell
+TIME_STEP = 0.1  # Seconds per tick of the hopping drone (10 Hz)
+MAX_SPEED = 3.0  # m/s
+MAX_ACCELERATION = 5.0  # m/s^2
+DEFAULT_SUBSTEPS = 4
+FALLBACK_DIRECTIONS = [(1, 0), (0, 1), (-1, 0), (0, -1)]  # Same order as Drone.move
+
+class KinematicsModel:
+    """Continuous-time point-mass dynamics for a Drone flying over the map grid.
+
+    The drone keeps a float exact_position in cells (cell centres on integer coordinates)
+    and a velocity in cells per second, so the sensors still report m/s. Each tick of dt
+    seconds is split into substeps: the velocity turns toward the commanded direction by at
+    most max_acceleration, and the speed is capped at max_speed and at what still lets the
+    drone stop before the next wall (or the end of a straight leg of its planned route). The
+    segment flown in every substep is swept cell by cell, so walls are never tunnelled
+    through and every cell crossed is covered and linked into the home index.
+
+    Works on plain floats: for a single drone a handful of scalar operations per substep
+    is cheaper than the call overhead of small numpy arrays.
+    """
+    def __init__(self, dt=TIME_STEP, substeps=DEFAULT_SUBSTEPS, max_speed=MAX_SPEED, max_acceleration=MAX_ACCELERATION):
+        self.dt = dt
+        self.substeps = substeps
+        self.max_speed = max_speed
+        self.max_acceleration = max_acceleration
+        self.speed_limit = max_speed / CELL_SIZE  # cells/s
+        self.acceleration_limit = max_acceleration / CELL_SIZE  # cells/s^2
+
+    def move(self, drone, direction):
+        """Fly one tick toward direction (None or (0, 0) brakes to a stop)."""
+        if direction is None:
+            direction = (0, 0)
+        # Only the way to go counts: (2, 0) accelerates along +x like (1, 0)
+        dx, dy = direction
+        dx, dy = (dx > 0) - (dx < 0), (dy > 0) - (dy < 0)
+        if (dx or dy) and not drone._is_valid_position((drone.position[0] + dx, drone.position[1] + dy)):
+            # Blocked straight ahead: turn to the first free direction, like a grid move does
+            for fallback in FALLBACK_DIRECTIONS:
+                if drone._is_valid_position((drone.position[0] + fallback[0], drone.position[1] + fallback[1])):
+                    drone.current_direction = dx, dy = fallback
+                    break
+            else:
+                dx, dy = 0, 0
+        free = self._free_cells(drone, (dx, dy))
+        run = self._stopping_distance(drone, (dx, dy), free)
+        # Cells the sweep need not check again (the distance field is the true map, not the belief)
+        known = free if drone.belief_map is None else 0
+
+        h = self.dt / self.substeps
+        max_change = self.acceleration_limit * h
+        # Past this much room ahead the drone can fly flat out and still brake in time
+        cruise = max(self.speed_limit ** 2 / (2 * self.acceleration_limit), self.speed_limit * h)
+        x, y = drone.exact_position
+        origin_x, origin_y = x, y
+        centre_x, centre_y = drone.position  # The run is measured from here
+        vx, vy = drone.velocity
+        start_vx, start_vy = vx, vy
+        # Unit vector to accelerate along, so that a diagonal is not flown faster than max_speed
+        ux, uy = (dx * math.sqrt(0.5), dy * math.sqrt(0.5)) if dx and dy else (dx, dy)
+        along_x = dy == 0 and vy == 0 and vx * dx >= 0
+        along_y = dx == 0 and vx == 0 and vy * dy >= 0
+        if along_x or along_y:
+            # Flying along one axis without turning back, the usual case: the same integration
+            # on that axis alone, and the tick is one straight segment to sweep
+            p, v, d = (x, vx, dx) if along_x else (y, vy, dy)
+            centre = drone.position[0] if along_x else drone.position[1]
+            for _ in range(self.substeps):
+                left = run - (p - centre) * d
+                if left >= cruise:
+                    speed = self.speed_limit
+                else:
+                    speed = max(0.0, min(math.sqrt(2 * self.acceleration_limit * max(left, 0.0)), left / h))
+                change = d * speed - v
+                if change:
+                    if abs(change) > max_change:
+                        change = change * max_change / abs(change)
+                    v += change
+                p += v * h
+            if along_x:
+                x, vx = p, v
+            else:
+                y, vy = p, v
+            if (math.floor(x + 0.5), math.floor(y + 0.5)) != drone.position:
+                if self._sweep(drone, origin_x, origin_y, x, y, known if d else 0) is not None:
+                    # Stopped short of a wall ahead, as every later substep would have been
+                    if along_x:
+                        x, vx = drone.position[0] + 0.499 * (1 if x > origin_x else -1), 0.0
+                    else:
+                        y, vy = drone.position[1] + 0.499 * (1 if y > origin_y else -1), 0.0
+        else:
+            for _ in range(self.substeps):
+                # Fastest speed that can still brake to a stop within what is left of the run
+                left = run - (x - centre_x) * dx - (y - centre_y) * dy
+                if left >= cruise:
+                    speed = self.speed_limit
+                else:
+                    speed = max(0.0, min(math.sqrt(2 * self.acceleration_limit * max(left, 0.0)), left / h))
+                change_x, change_y = ux * speed - vx, uy * speed - vy
+                if change_x or change_y:
+                    change = math.hypot(change_x, change_y)
+                    if change > max_change:
+                        change_x, change_y = change_x * max_change / change, change_y * max_change / change
+                    vx += change_x
+                    vy += change_y
+                if vx == 0 and vy == 0:
+                    continue
+                next_x, next_y = x + vx * h, y + vy * h
+                if math.floor(next_x + 0.5) == drone.position[0] and math.floor(next_y + 0.5) == drone.position[1]:
+                    x, y = next_x, next_y
+                    continue
+                hit = self._sweep(drone, x, y, next_x, next_y)
+                if hit is None:
+                    x, y = next_x, next_y
+                else:
+                    # Stop just short of the wall and slide along it
+                    t, across_x = hit
+                    x, y = x + (next_x - x) * t, y + (next_y - y) * t
+                    if across_x:
+                        x = drone.position[0] + 0.499 * (1 if vx > 0 else -1)
+                        vx = 0.0
+                    else:
+                        y = drone.position[1] + 0.499 * (1 if vy > 0 else -1)
+                        vy = 0.0
+
+        drone.exact_position = (x, y)
+        drone.velocity = (vx, vy)
+        drone.acceleration = ((vx - start_vx) / self.dt, (vy - start_vy) / self.dt)
+        if vx or vy:
+            drone.yaw = math.degrees(math.atan2(vy, vx))
+        drone.pitch = (vx * CELL_SIZE / self.max_speed) * 10  # Tilt with speed, 10 degrees at full speed
+        drone.roll = (vy * CELL_SIZE / self.max_speed) * 10
+
+    def stopped(self, drone):
+        """Whether the drone is hovering still."""
+        return drone.velocity[0] == 0 and drone.velocity[1] == 0
+
+    def _free_cells(self, drone, direction):
+        """Free cells straight ahead of the drone's cell along direction, by the distance field.
+
+        The distance runs to the first wall or to the last cell before the arena edge, and
+        only a wall is not free itself. Diagonals without a distance table are checked cell
+        by cell, as far as braking from full speed can need.
+        """
+        dx, dy = direction
+        if not (dx or dy):
+            return 0
+        if direction not in DIRECTIONS:
+            x, y = drone.position
+            limit = int(self.speed_limit ** 2 / (2 * self.acceleration_limit)) + 2
+            free = 0
+            while free < limit and drone._is_valid_position((x + (free + 1) * dx, y + (free + 1) * dy)):
+                free += 1
+            return free
+        distance = drone.distance_field.distance(drone.position, direction)
+        end = (drone.position[0] + distance * dx, drone.position[1] + distance * dy)
+        return distance if drone._is_valid_position(end) else distance - 1
+
+    def _stopping_distance(self, drone, direction, free):
+        """Cells the drone can fly along direction from the centre of its cell and still stop in a free cell."""
+        dx, dy = direction
+        if not (dx or dy):
+            return 0.0
+        # Come to a stop at the end of the straight leg of the way home, or of the planner's route
+        path = drone.return_path if drone.returning_home else drone.planner.planned_path(drone)
+        if len(path) > 1 and (path[1][0] - path[0][0], path[1][1] - path[0][1]) == direction:
+            leg = 1
+            while leg + 1 < len(path) and (path[leg + 1][0] - path[leg][0], path[leg + 1][1] - path[leg][1]) == direction:
+                leg += 1
+            free = min(free, leg)
+        return float(max(free, 0))
+
+    def _sweep(self, drone, x, y, next_x, next_y, free=0):
+        """Enter every cell the segment crosses (4-connected), in order.
+
+        The first free cells of a segment along one axis are known to be free and are not
+        checked again. Returns None if the segment is clear, otherwise the fraction of the
+        segment flown before the first wall and whether that wall was crossed into along x.
+        """
+        cell_x, cell_y = drone.position
+        end_x, end_y = math.floor(next_x + 0.5), math.floor(next_y + 0.5)
+        if end_y == cell_y or end_x == cell_x:
+            # Ends in the same row or column, the usual case: only one axis of boundaries is crossed
+            across_x = end_y == cell_y
+            start, end = (cell_x, end_x) if across_x else (cell_y, end_y)
+            step = 1 if end > start else -1
+            checked = start + step * (free + 1)  # First cell not known to be free
+            for k in range(start + step, end + step, step):
+                cell = (k, cell_y) if across_x else (cell_x, k)
+                if (k - checked) * step >= 0 and not drone._is_valid_position(cell):
+                    if across_x:
+                        return (k - 0.5 * step - x) / (next_x - x), True
+                    return (k - 0.5 * step - y) / (next_y - y), False
+                drone._enter(cell)
+            return None
+        span_x, span_y = next_x - x, next_y - y
+        step_x = 1 if span_x > 0 else -1
+        step_y = 1 if span_y > 0 else -1
+        # Segment fractions at which the next cell boundary is crossed in x and y
+        t_x = (cell_x + 0.5 * step_x - x) / span_x if span_x else math.inf
+        t_y = (cell_y + 0.5 * step_y - y) / span_y if span_y else math.inf
+        delta_x = abs(1 / span_x) if span_x else math.inf
+        delta_y = abs(1 / span_y) if span_y else math.inf
+        while (cell_x, cell_y) != (end_x, end_y) and min(t_x, t_y) <= 1:
+            if t_x <= t_y:
+                cell, t, across_x = (cell_x + step_x, cell_y), t_x, True
+            else:
+                cell, t, across_x = (cell_x, cell_y + step_y), t_y, False
+            if not drone._is_valid_position(cell):
+                return t, across_x
+            cell_x, cell_y = cell
+            if across_x:
+                t_x += delta_x
+            else:
+                t_y += delta_y
+            drone._enter(cell)
+        return None
@@ -0,0 +1,31 @@
+import numpy as np
+
+def generate_map(size, obstacle_density=0.1, seed=None, wall_length=(5, 60)):
+    """Generate a random map of wall segments in the same format as the map_data built in main.py.
+
+    Returns (map_data, start_position): a float array of ones (free) and zeros (walls) of shape
+    size, where about obstacle_density of the cells are walls, and a free start in the middle.
+    """
+    rng = np.random.default_rng(seed)
+    height, width = (size, size) if np.isscalar(size) else size
+    map_data = np.ones((height, width))
+    target = int(obstacle_density * height * width)
+
+    # Draw walls in batches of horizontal and vertical segments until the density is reached
+    while np.count_nonzero(map_data == 0) < target:
+        missing = target - np.count_nonzero(map_data == 0)
+        count = max(1, missing // wall_length[1])
+        lengths = rng.integers(wall_length[0], wall_length[1] + 1, count)
+        xs = rng.integers(0, width, count)
+        ys = rng.integers(0, height, count)
+        vertical = rng.random(count) < 0.5
+        offsets = np.arange(wall_length[1])
+        mask = offsets < lengths[:, None]
+        wall_x = np.where(vertical[:, None], xs[:, None], xs[:, None] + offsets)[mask]
+        wall_y = np.where(vertical[:, None], ys[:, None] + offsets, ys[:, None])[mask]
+        inside = (wall_x < width) & (wall_y < height)
+        map_data[wall_y[inside], wall_x[inside]] = 0
+
+    start_position = (width // 2, height // 2)
+    map_data[max(0, height // 2 - 2):height // 2 + 3, max(0, width // 2 - 2):width // 2 + 3] = 1
+    return map_data, start_position
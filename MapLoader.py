@@ -0,0 +1,125 @@
+import hashlib
+import os
+import numpy as np
+from DistanceField import DistanceField, DIRECTIONS
+
+CACHE_VERSION = 1  # Bump whenever the preprocessing changes, old cache files are then ignored
+DEFAULT_THRESHOLD = 128  # Grey levels at or above this are free space
+
+class FloorPlan:
+    """A map loaded from a floor-plan image, with its preprocessed artefacts."""
+    def __init__(self, source, map_data, distance_field, components):
+        self.source = source
+        self.map_data = map_data  # Float ones (free) and zeros (walls), like main.py
+        self.distance_field = distance_field
+        self.components = components  # Connected free-space label per cell, -1 on walls
+
+    def reachable(self, position):
+        """Mask of the free cells connected to position."""
+        x, y = position
+        label = self.components[y, x]
+        return self.components == label if label >= 0 else np.zeros(self.components.shape, dtype=bool)
+
+def read_image(path):
+    """Read a floor-plan image as a 2D uint8 grey-level array."""
+    with open(path, "rb") as image_file:
+        magic = image_file.read(2)
+    if magic in (b"P2", b"P5"):
+        return read_pgm(path)
+    import pygame  # Only needed for PNG and the other formats pygame decodes
+    pixels = pygame.surfarray.array3d(pygame.image.load(path)).astype(np.float32)
+    grey = pixels @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    return grey.T.round().astype(np.uint8)  # surfarray is indexed [x, y]
+
+def read_pgm(path):
+    """Read a binary (P5) or plain (P2) PGM image, scaled to 0-255."""
+    with open(path, "rb") as image_file:
+        data = image_file.read()
+    fields = []
+    position = 0
+    while len(fields) < 4:
+        # Header fields are whitespace separated, with # comments running to the end of the line
+        while data[position:position + 1].isspace():
+            position += 1
+        if data[position:position + 1] == b"#":
+            position = data.index(b"\n", position) + 1
+            continue
+        end = position
+        while not data[end:end + 1].isspace():
+            end += 1
+        fields.append(data[position:end])
+        position = end
+    magic, width, height, max_value = fields[0], int(fields[1]), int(fields[2]), int(fields[3])
+    if magic == b"P5":
+        dtype = np.uint8 if max_value < 256 else np.dtype(">u2")
+        pixels = np.frombuffer(data, dtype=dtype, count=width * height, offset=position + 1)
+    else:
+        pixels = np.array(data[position:].split()[:width * height], dtype=np.int64)
+    pixels = pixels.reshape(height, width).astype(np.float64)
+    return np.round(pixels * 255 / max_value).astype(np.uint8)
+
+def to_map_data(grey, threshold=DEFAULT_THRESHOLD):
+    """Occupancy grid from grey levels: light cells are free (1), dark cells are walls (0)."""
+    return (grey >= threshold).astype(np.float64)
+
+def connected_components(map_data):
+    """Label the 4-connected free regions of a map, -1 on walls."""
+    free = map_data == 1
+    height, width = map_data.shape
+    cells = np.arange(height * width).reshape(height, width)
+    across = free[:, :-1] & free[:, 1:]
+    down = free[:-1, :] & free[1:, :]
+    first = np.concatenate([cells[:, :-1][across], cells[:-1, :][down]])
+    second = np.concatenate([cells[:, 1:][across], cells[1:, :][down]])
+
+    # Union-find over all edges at once: hook the larger root of every edge that still joins two
+    # trees onto the smaller one, then compress every path to its root, until no edge is left
+    parent = np.arange(height * width)
+    while len(first):
+        root_first, root_second = parent[first], parent[second]
+        joining = root_first != root_second
+        first, second = first[joining], second[joining]
+        np.minimum.at(parent, np.maximum(root_first, root_second)[joining], np.minimum(root_first, root_second)[joining])
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+    components = np.full(height * width, -1, dtype=np.int32)
+    _, components[free.reshape(-1)] = np.unique(parent[free.reshape(-1)], return_inverse=True)
+    return components.reshape(height, width)
+
+def _content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as source_file:
+        for block in iter(lambda: source_file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cache_path(path, threshold=DEFAULT_THRESHOLD):
+    """Where the preprocessed artefacts of a floor plan are cached, next to the image."""
+    directory, name = os.path.split(os.path.abspath(path))
+    key = f"{_content_hash(path)[:32]}-t{threshold}-v{CACHE_VERSION}.npz"
+    return os.path.join(directory, f".{name}.cache", key)
+
+def load_map(path, threshold=DEFAULT_THRESHOLD, cache=True):
+    """Load a PNG/PGM floor plan as a FloorPlan, reusing cached preprocessing when the image is unchanged."""
+    cached = cache_path(path, threshold) if cache else None
+    if cached is not None and os.path.exists(cached):
+        with np.load(cached) as artefacts:
+            map_data = artefacts['grid'].astype(np.float64)
+            steps = {direction: artefacts[f"steps_{index}"] for index, direction in enumerate(DIRECTIONS)}
+            components = artefacts['components']
+        return FloorPlan(path, map_data, DistanceField(map_data, steps), components)
+
+    map_data = to_map_data(read_image(path), threshold)
+    distance_field = DistanceField(map_data)
+    components = connected_components(map_data)
+    if cached is not None:
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        steps = {f"steps_{index}": distance_field.steps[direction] for index, direction in enumerate(DIRECTIONS)}
+        temporary = cached + ".tmp.npz"
+        np.savez(temporary, grid=map_data.astype(np.uint8), components=components, **steps)
+        os.replace(temporary, cached)  # Readers never see a half-written cache file
+    return FloorPlan(path, map_data, distance_field, components)
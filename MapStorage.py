@@ -0,0 +1,156 @@
+import struct
+from collections import OrderedDict
+import numpy as np
+
+MAGIC = b"DRONEMAP"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIQQI")  # magic, version, height, width, tile size
+HEADER_SIZE = 64  # Tile data starts here, the rest of the header is padding
+DEFAULT_TILE_SIZE = 256
+DEFAULT_CACHE_TILES = 64
+
+class TiledMap:
+    """Map stored bit-packed (1 = free, 0 = wall) in square tiles of a memory-mapped file.
+
+    Tiles are unpacked on first access and kept in a small LRU cache, so only the
+    neighbourhood of the drone is ever resident. Supports map[y, x] and map[y0:y1, x0:x1]
+    like the dense map_data arrays, and ray-marches sensor distances tile by tile. A
+    sensor_range (in cells) stops rays early so far walls never pull in distant tiles.
+    """
+    def __init__(self, path, cache_tiles=DEFAULT_CACHE_TILES, writable=False, sensor_range=None):
+        self.path = path
+        self.cache_tiles = cache_tiles
+        self.writable = writable
+        self.sensor_range = sensor_range
+        with open(path, "rb") as map_file:
+            magic, version, height, width, tile_size = HEADER.unpack(map_file.read(HEADER.size))
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} tiled map file")
+        self.shape = (height, width)
+        self.tile_size = tile_size
+        self.tiles_y = -(-height // tile_size)
+        self.tiles_x = -(-width // tile_size)
+        self.data = np.memmap(path, dtype=np.uint8, mode="r+" if writable else "r", offset=HEADER_SIZE,
+                              shape=(self.tiles_y * self.tiles_x, tile_size * tile_size // 8))
+        self.cache = OrderedDict()
+
+    @classmethod
+    def create(cls, path, shape, tile_size=DEFAULT_TILE_SIZE, fill=1, cache_tiles=DEFAULT_CACHE_TILES):
+        """Create a map file of the given shape with every cell set to fill, and open it for writing."""
+        if tile_size % 8:
+            raise ValueError("tile_size must be a multiple of 8")
+        height, width = shape
+        tile_count = -(-height // tile_size) * -(-width // tile_size)
+        tile_bytes = tile_size * tile_size // 8
+        with open(path, "wb") as map_file:
+            map_file.write(HEADER.pack(MAGIC, FORMAT_VERSION, height, width, tile_size).ljust(HEADER_SIZE, b"\0"))
+            if fill:
+                block = b"\xff" * tile_bytes
+                for _ in range(tile_count):
+                    map_file.write(block)
+            else:
+                map_file.truncate(HEADER_SIZE + tile_count * tile_bytes)
+        return cls(path, cache_tiles, writable=True)
+
+    @classmethod
+    def from_array(cls, path, map_data, tile_size=DEFAULT_TILE_SIZE, cache_tiles=DEFAULT_CACHE_TILES):
+        """Write a dense map_data array to a tiled map file and open it."""
+        tiled_map = cls.create(path, map_data.shape, tile_size, fill=1, cache_tiles=cache_tiles)
+        tiled_map.write_region(0, 0, map_data)
+        tiled_map.flush()
+        return cls(path, cache_tiles)
+
+    def __getstate__(self):
+        # Pickle by path so process pools reopen the file instead of copying the map
+        return {'path': self.path, 'cache_tiles': self.cache_tiles, 'writable': self.writable,
+                'sensor_range': self.sensor_range}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['cache_tiles'], state['writable'], state['sensor_range'])
+
+    def tile(self, tile_y, tile_x):
+        """Unpacked uint8 cells of one tile, loading it and evicting the least recently used if needed."""
+        key = (tile_y, tile_x)
+        cells = self.cache.get(key)
+        if cells is not None:
+            self.cache.move_to_end(key)
+            return cells
+        packed = self.data[tile_y * self.tiles_x + tile_x]
+        cells = np.unpackbits(packed, bitorder="little").reshape(self.tile_size, self.tile_size)
+        self.cache[key] = cells
+        if len(self.cache) > self.cache_tiles:
+            self.cache.popitem(last=False)
+        return cells
+
+    def __getitem__(self, key):
+        y, x = key
+        if isinstance(y, slice) or isinstance(x, slice):
+            return self.read_region(y, x)
+        if not (0 <= y < self.shape[0] and 0 <= x < self.shape[1]):
+            raise IndexError(f"cell {(x, y)} is outside the map")
+        return self.tile(y // self.tile_size, x // self.tile_size)[y % self.tile_size, x % self.tile_size]
+
+    def read_region(self, rows, columns):
+        """Dense uint8 copy of map[rows, columns] for two slices with unit step."""
+        y0, y1, _ = rows.indices(self.shape[0])
+        x0, x1, _ = columns.indices(self.shape[1])
+        region = np.empty((max(0, y1 - y0), max(0, x1 - x0)), dtype=np.uint8)
+        size = self.tile_size
+        for tile_y in range(y0 // size, -(-y1 // size)):
+            for tile_x in range(x0 // size, -(-x1 // size)):
+                top, left = tile_y * size, tile_x * size
+                ys = slice(max(y0, top), min(y1, top + size))
+                xs = slice(max(x0, left), min(x1, left + size))
+                region[ys.start - y0:ys.stop - y0, xs.start - x0:xs.stop - x0] = \
+                    self.tile(tile_y, tile_x)[ys.start - top:ys.stop - top, xs.start - left:xs.stop - left]
+        return region
+
+    def write_region(self, y0, x0, block):
+        """Write a dense block of cells (1 = free) with its top-left corner at (x0, y0)."""
+        if not self.writable:
+            raise ValueError("map was opened read-only")
+        block = np.asarray(block) == 1
+        y1, x1 = y0 + block.shape[0], x0 + block.shape[1]
+        size = self.tile_size
+        for tile_y in range(y0 // size, -(-y1 // size)):
+            for tile_x in range(x0 // size, -(-x1 // size)):
+                top, left = tile_y * size, tile_x * size
+                ys = slice(max(y0, top), min(y1, top + size))
+                xs = slice(max(x0, left), min(x1, left + size))
+                cells = self.tile(tile_y, tile_x).copy()
+                cells[ys.start - top:ys.stop - top, xs.start - left:xs.stop - left] = \
+                    block[ys.start - y0:ys.stop - y0, xs.start - x0:xs.stop - x0]
+                self.data[tile_y * self.tiles_x + tile_x] = np.packbits(cells, bitorder="little")
+                self.cache[(tile_y, tile_x)] = cells
+
+    def flush(self):
+        """Write pending changes to disk."""
+        self.data.flush()
+
+    def distance(self, position, direction):
+        """Number of cells from position to the first wall (inclusive) or the map edge, like DistanceField."""
+        x, y = position
+        dx, dy = direction
+        height, width = self.shape
+        size = self.tile_size
+        limit = self.sensor_range if self.sensor_range is not None else max(height, width)
+        steps = 0
+        while 0 <= x + dx < width and 0 <= y + dy < height and steps < limit:
+            # Scan the part of the ray inside the next tile (and the map) in one go
+            nx, ny = x + dx, y + dy
+            tile_x, tile_y = nx // size, ny // size
+            run = []
+            if dx:
+                run.append((min(width, (tile_x + 1) * size) - nx) if dx > 0 else nx - tile_x * size + 1)
+            if dy:
+                run.append((min(height, (tile_y + 1) * size) - ny) if dy > 0 else ny - tile_y * size + 1)
+            count = min(min(run), limit - steps)
+            k = np.arange(count)
+            cells = self.tile(tile_y, tile_x)[ny - tile_y * size + k * dy, nx - tile_x * size + k * dx]
+            walls = np.flatnonzero(cells == 0)
+            if walls.size:
+                return steps + int(walls[0]) + 1
+            steps += count
+            x += count * dx
+            y += count * dy
+        return steps
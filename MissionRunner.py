@@ -0,0 +1,50 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from DistanceField import distance_model
+from SimulationEngine import SimulationEngine
+
+MAX_MISSION_STEPS = 100000  # Safety cap for missions that never land
+
+# Map and sensor tables of a pool worker, built once by _init_worker instead of per mission
+_worker_map = None
+_worker_distance_field = None
+
+def run_mission(map_data, start_position, far_point, seed, distance_field=None, max_steps=MAX_MISSION_STEPS):
+    """Fly one headless mission with its own random stream and summarise the result."""
+    engine = SimulationEngine(map_data, start_position, far_point, distance_field=distance_field, seed=seed)
+    drone = engine.run(max_steps)
+    return {
+        'start_position': start_position,
+        'far_point': far_point,
+        'seed': seed,
+        'coverage': len(drone.covered_area),
+        'flight_time': drone.time_elapsed,
+        'battery': drone.battery_level,
+        'returned': drone.flight_state == "Landed" and drone.position == drone.start_position,
+        'steps': engine.steps
+    }
+
+def _init_worker(map_data):
+    """Keep the map in the worker and precompute its sensor tables once."""
+    global _worker_map, _worker_distance_field
+    _worker_map = map_data
+    _worker_distance_field = distance_model(map_data)
+
+def _run_batch(missions):
+    """Run a batch of (start_position, far_point, seed) missions inside a worker."""
+    return [run_mission(_worker_map, start, far, seed, _worker_distance_field) for start, far, seed in missions]
+
+def run_missions(map_data, start_positions, far_points, seeds, workers=None, batch_size=1):
+    """Fly every (start_position, far_point) pair once per seed across a process pool.
+
+    Results are yielded as missions finish, so their order is not the submission order.
+    Each mission is seeded on its own, so the result of a (start, far point, seed) triple
+    does not depend on the worker that ran it.
+    """
+    missions = [(tuple(start), tuple(far), seed) for start, far in zip(start_positions, far_points) for seed in seeds]
+    batches = [missions[i:i + batch_size] for i in range(0, len(missions), batch_size)]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(map_data,)) as pool:
+        futures = [pool.submit(_run_batch, batch) for batch in batches]
+        for future in as_completed(futures):
+            for result in future.result():
+                yield result
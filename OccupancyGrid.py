@@ -0,0 +1,106 @@
+import numpy as np
+from Kinematics import CELL_SIZE
+
+UNKNOWN, FREE, OCCUPIED = 0, 1, 2
+SENSED_FROM = 4  # Flag on a free cell the beams have already been cast from (the map does not change)
+SENSOR_OFFSET = 0.1  # Metres get_sensor_data subtracts from every ToF range (the drone's radius)
+# ToF beams of get_sensor_data: d0 up, d1 down, d2 left, d3 right, d4 forward
+BEAMS = {'d0': (0, -1), 'd1': (0, 1), 'd2': (-1, 0), 'd3': (1, 0), 'd4': (1, 1)}
+BEAM_DIRECTIONS = np.array(list(BEAMS.values()), dtype=np.int64)
+
+class OccupancyGrid:
+    """The drone's own map: unknown, free or occupied per cell, built from what it has sensed.
+
+    Cells are kept in square uint8 tiles that only exist once a beam has reached them, so
+    memory follows the sensed area rather than the size of the map. Tiles are shared
+    copy-on-write between copies, like TiledCoverage.
+    """
+    def __init__(self, shape, tile_size=64):
+        self.shape = shape  # Size of the arena, the one thing the drone knows in advance
+        self.tile_size = tile_size
+        self.tiles_x = -(-shape[1] // tile_size)
+        self.tiles = {}
+        self.shared = set()  # Tiles that may be shared with a copy, copied before writing
+
+    def copy(self):
+        """Copy that shares every tile until either side writes to it."""
+        twin = OccupancyGrid(self.shape, self.tile_size)
+        twin.tiles = dict(self.tiles)
+        self.shared.update(self.tiles)
+        twin.shared = set(self.tiles)
+        return twin
+
+    def state(self, position):
+        """UNKNOWN, FREE or OCCUPIED for an (x, y) cell."""
+        x, y = position
+        tile = self.tiles.get((y // self.tile_size, x // self.tile_size))
+        return UNKNOWN if tile is None else int(tile[y % self.tile_size, x % self.tile_size]) & ~SENSED_FROM
+
+    def update(self, xs, ys, states):
+        """Set many cells at once, given as arrays of x, y and state. A cell keeps its SENSED_FROM flag."""
+        size = self.tile_size
+        keys = (ys // size) * self.tiles_x + xs // size
+        if keys.min() == keys.max():
+            bounds = [(0, len(keys))]  # All in one tile, the usual case near walls
+        else:
+            order = np.argsort(keys, kind="stable")
+            keys, xs, ys, states = keys[order], xs[order], ys[order], states[order]
+            starts = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+            bounds = zip([0, *starts.tolist()], [*starts.tolist(), len(keys)])
+        for start, stop in bounds:
+            key = divmod(int(keys[start]), self.tiles_x)
+            tile = self.tiles.get(key)
+            if tile is None:
+                tile = self.tiles[key] = np.zeros((size, size), dtype=np.uint8)
+            elif key in self.shared:
+                tile = self.tiles[key] = tile.copy()
+                self.shared.discard(key)
+            rows, columns = ys[start:stop] % size, xs[start:stop] % size
+            tile[rows, columns] = states[start:stop] | (tile[rows, columns] & SENSED_FROM)
+
+    def integrate(self, position, readings):
+        """Ray-cast the ToF readings taken at position: free along each beam, occupied where it stopped.
+
+        A reading of 0 only says that a wall is closer than the drone's radius, so that beam
+        adds nothing. A beam that ends on the last cell before the arena edge may have hit
+        the edge rather than a wall, so its end cell stays unknown. Readings from a cell that
+        has been cast from before are skipped, they cannot add anything.
+        """
+        x, y = position
+        size = self.tile_size
+        tile = self.tiles.get((y // size, x // size))
+        if tile is not None and tile[y % size, x % size] & SENSED_FROM:
+            return
+        height, width = self.shape
+        readings = np.fromiter((readings[name] for name in BEAMS), dtype=np.float64, count=len(BEAMS))
+        steps = np.rint((readings + SENSOR_OFFSET) / CELL_SIZE).astype(np.int64)
+        steps[readings <= 0] = 0
+        beyond_x = x + BEAM_DIRECTIONS[:, 0] * (steps + 1)
+        beyond_y = y + BEAM_DIRECTIONS[:, 1] * (steps + 1)
+        wall = (steps > 0) & (0 <= beyond_x) & (beyond_x < width) & (0 <= beyond_y) & (beyond_y < height)
+
+        # Cells 1 to steps - 1 of each beam are free, cell steps is the wall it hit. The drone's
+        # own cell goes first, once, so that no beam overwrites its flag
+        lengths = np.maximum(steps - 1, 0) + wall
+        total = int(lengths.sum())
+        offset = np.arange(1, total + 1) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        xs = np.empty(total + 1, dtype=np.int64)
+        ys = np.empty(total + 1, dtype=np.int64)
+        states = np.empty(total + 1, dtype=np.uint8)
+        xs[0], ys[0], states[0] = x, y, FREE | SENSED_FROM
+        xs[1:] = x + np.repeat(BEAM_DIRECTIONS[:, 0], lengths) * offset
+        ys[1:] = y + np.repeat(BEAM_DIRECTIONS[:, 1], lengths) * offset
+        states[1:] = FREE + (offset == np.repeat(np.where(wall, steps, -1), lengths))
+        self.update(xs, ys, states)
+
+    def known(self):
+        """Number of cells sensed as free or occupied."""
+        return sum(int(np.count_nonzero(tile)) for tile in self.tiles.values())
+
+    def to_array(self):
+        """Dense (height, width) uint8 copy of the belief, UNKNOWN where nothing was sensed."""
+        size = self.tile_size
+        grid = np.zeros((-(-self.shape[0] // size) * size, self.tiles_x * size), dtype=np.uint8)
+        for (tile_y, tile_x), tile in self.tiles.items():
+            grid[tile_y * size:(tile_y + 1) * size, tile_x * size:(tile_x + 1) * size] = tile
+        return grid[:self.shape[0], :self.shape[1]] & ~np.uint8(SENSED_FROM)
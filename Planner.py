@@ -0,0 +1,125 @@
+import copy
+import logging
+from collections import deque
+
+NEIGHBOUR_DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+
+logger = logging.getLogger(__name__)
+
+class Planner:
+    """Chooses the drone's next move while it is exploring."""
+    def next_move(self, drone):
+        """Return the (dx, dy) direction to move in next."""
+        raise NotImplementedError
+
+    def planned_path(self, drone):
+        """Cells the planner is committed to, starting at the drone's cell ([] when it decides move by move)."""
+        return []
+
+    def copy(self):
+        """Independent copy for a forked mission. Planners with mutable containers override this."""
+        return copy.copy(self)
+
+    def _unvisited_neighbours(self, drone, position):
+        """Directions from position to free cells the drone has not covered yet."""
+        x, y = position
+        unvisited = []
+        for direction in NEIGHBOUR_DIRECTIONS:
+            next_position = (x + direction[0], y + direction[1])
+            if drone._is_valid_position(next_position) and next_position not in drone.covered_area:
+                unvisited.append(direction)
+        return unvisited
+
+class RandomWalkPlanner(Planner):
+    """Move to a random unvisited neighbour, or keep going in the current direction."""
+    def next_move(self, drone):
+        unvisited_adjacent = self._unvisited_neighbours(drone, drone.position)
+        if unvisited_adjacent:
+            next_move = drone.rng.choice(unvisited_adjacent)
+            logger.debug("Unvisited adjacent: %s, Next move: %s", unvisited_adjacent, next_move)
+            return next_move
+
+        logger.debug("Continuing in current direction: %s", drone.current_direction)
+        return drone.current_direction
+
+class FrontierPlanner(Planner):
+    """Sweep unvisited neighbours and, when boxed in, route over covered cells to the nearest frontier.
+
+    The frontier (free, uncovered cells next to the path) is updated only from the path points
+    added since the previous call, and a route is kept until its target is reached or covered.
+    """
+    def __init__(self):
+        self.frontier = set()
+        self.seen = 0  # Path points already folded into the frontier
+        self.route = deque()  # Cells still to visit on the way to the current target
+
+    def next_move(self, drone):
+        self._update_frontier(drone)
+        x, y = drone.position
+
+        unvisited = self._unvisited_neighbours(drone, drone.position)
+        if unvisited:
+            self.route.clear()
+            # Sweep along the drone's current direction, otherwise take the neighbour with the
+            # fewest open cells around it so no pockets are left behind
+            if drone.current_direction in unvisited:
+                return drone.current_direction
+            return min(unvisited, key=lambda d: len(self._unvisited_neighbours(drone, (x + d[0], y + d[1]))))
+
+        if self.route and self.route[0] != drone.position and drone.position in self.route:
+            # With momentum the drone can fly several cells along the route in one tick
+            while self.route[0] != drone.position:
+                self.route.popleft()
+        if not self.frontier:
+            self.route.clear()  # Everything reachable is covered, skip the search
+        elif not self.route or self.route[-1] not in self.frontier or self.route[0] != drone.position:
+            self.route = self._route_to_frontier(drone)
+        if len(self.route) < 2:
+            logger.debug("No reachable frontier, continuing in current direction: %s", drone.current_direction)
+            return drone.current_direction
+
+        self.route.popleft()
+        next_x, next_y = self.route[0]
+        logger.debug("Routing to frontier %s, next cell: %s", self.route[-1], self.route[0])
+        return (next_x - x, next_y - y)
+
+    def planned_path(self, drone):
+        return [drone.position, *self.route] if self.route else []
+
+    def copy(self):
+        twin = FrontierPlanner()
+        twin.frontier, twin.seen, twin.route = set(self.frontier), self.seen, deque(self.route)
+        return twin
+
+    def _update_frontier(self, drone):
+        """Fold the path points added since the last call into the frontier set."""
+        for x, y in drone.path[self.seen:]:
+            self.frontier.discard((x, y))
+            for dx, dy in NEIGHBOUR_DIRECTIONS:
+                neighbour = (x + dx, y + dy)
+                if neighbour not in drone.covered_area and drone._is_valid_position(neighbour):
+                    self.frontier.add(neighbour)
+        self.seen = len(drone.path)
+
+    def _route_to_frontier(self, drone):
+        """Breadth-first search over covered cells from the drone to the nearest frontier cell."""
+        start = drone.position
+        previous = {start: None}
+        queue = deque([start])
+        while queue:
+            cell = queue.popleft()
+            if cell in self.frontier and cell != start:
+                route = deque()
+                while cell is not None:
+                    route.appendleft(cell)
+                    cell = previous[cell]
+                return route
+            x, y = cell
+            for dx, dy in NEIGHBOUR_DIRECTIONS:
+                neighbour = (x + dx, y + dy)
+                if neighbour in previous:
+                    continue
+                if neighbour in self.frontier or neighbour in drone.covered_area or neighbour == drone.start_position:
+                    previous[neighbour] = cell
+                    queue.append(neighbour)
+        return deque()
@@ -0,0 +1,124 @@
+import os
+import numpy as np
+from Drone import FLIGHT_STATES
+from Telemetry import TELEMETRY_DTYPE, TELEMETRY_SENSORS, SENSOR_FIELDS, Telemetry
+
+def path_file(path):
+    """Side file next to a flight log that holds the cells of the drone's path."""
+    return path + ".path"
+
+def record_mission(engine, path, level=TELEMETRY_SENSORS, max_steps=None):
+    """Fly a mission headlessly, writing one telemetry record per step to path, and return the drone.
+
+    The cells of the path go to path_file(path) as int32 (x, y) pairs, so playback draws
+    every cell a kinematic drone swept through in a step, not only the one it ended in.
+    """
+    open(path, "wb").close()  # Telemetry appends, start from an empty file
+    telemetry = Telemetry(level=level, path=path)
+    engine.telemetry = telemetry
+    try:
+        return engine.run(max_steps)
+    finally:
+        telemetry.flush()
+        engine.telemetry = None
+        engine.drone.path.to_array().astype(np.int32).tofile(path_file(path))
+
+class FlightLog:
+    """Telemetry file memory-mapped as fixed-size records, so any step is one offset away."""
+    def __init__(self, path):
+        self.path = path
+        self.records = np.memmap(path, dtype=TELEMETRY_DTYPE, mode="r")
+        self.times = self.records['time']
+        cells = path_file(path)
+        # Path cells, indexed by each record's path_length, or None for a log without them
+        self.cells = np.memmap(cells, dtype=np.int32, mode="r").reshape(-1, 2) if os.path.exists(cells) else None
+
+    def __len__(self):
+        return len(self.records)
+
+    def index(self, step):
+        """Record index of a step, or of the last step before it if that one was not recorded."""
+        first = int(self.records[0]['step']) if len(self.records) else 0
+        guess = step - first
+        if 0 <= guess < len(self.records) and self.records[guess]['step'] == step:
+            return guess  # Steps are recorded contiguously, the usual case
+        return int(np.searchsorted(self.records['step'], step, side="right")) - 1
+
+    def index_at_time(self, flight_time):
+        """Index of the last record at or before the given flight time."""
+        return int(np.searchsorted(self.times, flight_time, side="right")) - 1
+
+class ReplayPath:
+    """The path of a ReplayDrone up to its current record, like Drone.path for the viewer."""
+    def __init__(self, drone):
+        self.drone = drone
+
+    def __len__(self):
+        if self.drone.log.cells is None:
+            return self.drone.index + 2  # The start, then one point per record
+        record = self.drone.record
+        return 1 if record is None else int(record['path_length'])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1 or None][0]
+        start, stop, _ = index.indices(len(self))
+        if self.drone.log.cells is not None:
+            return [tuple(cell) for cell in self.drone.log.cells[start:stop].tolist()]
+        points = [self.drone.start_position] if start == 0 and stop > 0 else []
+        records = self.drone.log.records[max(start - 1, 0):max(stop - 1, 0)]
+        points.extend(zip(records['x'].tolist(), records['y'].tolist()))
+        return points
+
+    def __iter__(self):
+        return iter(self[:])
+
+class ReplayDrone:
+    """Read-only stand-in for a Drone that shows the state recorded in a flight log.
+
+    Has the attributes and get_sensor_data() the viewer draws from. Index -1 is the drone
+    on the ground at the start, before the first recorded step.
+    """
+    def __init__(self, log, start_position):
+        self.log = log
+        self.start_position = start_position
+        self.path = ReplayPath(self)
+        self.index = -1
+
+    def seek(self, index):
+        """Move to a record index, clamped to the log."""
+        self.index = max(-1, min(index, len(self.log) - 1))
+
+    @property
+    def record(self):
+        return self.log.records[self.index] if self.index >= 0 else None
+
+    @property
+    def position(self):
+        record = self.record
+        return self.start_position if record is None else (int(record['x']), int(record['y']))
+
+    @property
+    def flight_state(self):
+        record = self.record
+        return FLIGHT_STATES[0] if record is None else FLIGHT_STATES[record['flight_state']]
+
+    @property
+    def battery_level(self):
+        record = self.record
+        return 100.0 if record is None else float(record['battery'])
+
+    @property
+    def time_elapsed(self):
+        record = self.record
+        return 0.0 if record is None else float(record['time'])
+
+    @property
+    def step(self):
+        record = self.record
+        return 0 if record is None else int(record['step'])
+
+    def get_sensor_data(self):
+        """Sensor readings recorded at the current step (NaN when they were not recorded)."""
+        record = self.record
+        return {name: float('nan') if record is None else float(record[name]) for name in SENSOR_FIELDS}
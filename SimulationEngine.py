@@ -0,0 +1,67 @@
+import logging
+from Drone import Drone
+from Kinematics import TIME_STEP
+
+logger = logging.getLogger(__name__)
+
+class SimulationEngine:
+    """Headless stepping engine that flies a single drone mission as fast as possible."""
+    def __init__(self, map_data, start_position, far_point, telemetry=None, **drone_options):
+        self.map_data = map_data
+        self.start_position = start_position
+        self.far_point = far_point
+        self.drone = Drone(start_position, map_data, far_point, **drone_options)
+        self.telemetry = telemetry  # Optional Telemetry recorder, fed after every step
+        self.steps = 0
+
+    @property
+    def finished(self):
+        """Whether the mission is over (the drone has landed)."""
+        return self.drone.flight_state == "Landed"
+
+    def step(self, move=None):
+        """Advance the mission state machine by one tick and return the new flight state.
+
+        While exploring, a move given here is flown instead of asking the planner.
+        """
+        drone = self.drone
+        if drone.flight_state == "Taking off":
+            drone.takeoff()
+            drone.flight_state = "Flying"
+        elif drone.flight_state == "Flying":
+            if not drone.should_return_home():
+                self._fly(move if move is not None else drone.plan_next_move())
+            else:
+                drone.start_returning_home()
+                drone.flight_state = "Returning home"
+        elif drone.flight_state == "Returning home":
+            move = drone.return_home()
+            if move is None:
+                drone.flight_state = "Landing"
+            elif drone.battery_level <= 0:
+                logger.warning("Battery empty at %s on the way home, landing there", drone.position)
+                drone.flight_state = "Landing"
+            else:
+                self._fly(move)
+        elif drone.flight_state == "Landing":
+            drone.land()
+            drone.flight_state = "Landed"
+
+        self.steps += 1
+        if self.telemetry is not None:
+            self.telemetry.record(self.steps, drone)
+        return drone.flight_state
+
+    def _fly(self, move):
+        """Move the drone for one tick, which lasts the kinematics model's dt if it has one."""
+        drone = self.drone
+        time_step = drone.time_step
+        drone.move(move)
+        drone.update_battery(time_step / TIME_STEP)
+        drone.time_elapsed += time_step
+
+    def run(self, max_steps=None):
+        """Step until the drone lands (or max_steps ticks have run) and return the drone."""
+        while not self.finished and (max_steps is None or self.steps < max_steps):
+            self.step()
+        return self.drone
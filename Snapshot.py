@@ -0,0 +1,188 @@
+import pickle
+import random
+import zlib
+from collections import defaultdict
+import numpy as np
+from Coverage import CoverageGrid, PathStore, TiledCoverage
+from HomeIndex import HomeIndex
+from SimulationEngine import SimulationEngine
+
+SNAPSHOT_VERSION = 1
+# Drone attributes that hold immutable values, so forks and snapshots can take them as they are
+DRONE_FIELDS = ("position", "exact_position", "battery_level", "time_elapsed", "current_direction",
+                "returning_home", "return_battery_level", "yaw", "pitch", "roll", "velocity",
+                "acceleration", "altitude", "flight_state", "estimated_position", "flow")
+
+def fork(engine):
+    """Independent copy of a mission in flight, for what-if rollouts.
+
+    The map, distance field and kinematics model are shared. Coverage, the full path
+    chunks and the tiles of a belief map are shared copy-on-write, and the home index is
+    copied with shallow dict copies, so forking costs little more than the size of the
+    explored graph.
+    """
+    drone = engine.drone
+    twin = SimulationEngine(engine.map_data, engine.start_position, engine.far_point,
+                            distance_field=drone.distance_field, planner=drone.planner.copy(),
+                            kinematics=drone.kinematics,
+                            belief_map=drone.belief_map.copy() if drone.belief_map is not None else None)
+    twin.steps = engine.steps
+    copy = twin.drone
+    for name in DRONE_FIELDS:
+        setattr(copy, name, getattr(drone, name))
+    copy.covered_area = drone.covered_area.copy()
+    copy.path = drone.path.copy()
+    copy.home_index = drone.home_index.copy()
+    copy.adjacency_list = copy.home_index.adjacency
+    copy.return_path = list(drone.return_path)
+    copy.rng.setstate(drone.rng.getstate())
+    return twin
+
+def snapshot(engine, compress=True):
+    """Encode the whole state of a mission as bytes (without the map and distance field)."""
+    drone = engine.drone
+    state = {
+        'version': SNAPSHOT_VERSION,
+        'steps': engine.steps,
+        'start_position': engine.start_position,
+        'far_point': engine.far_point,
+        'drone': {name: getattr(drone, name) for name in DRONE_FIELDS},
+        'coverage': _encode_coverage(drone.covered_area),
+        'path': drone.path.to_array(),
+        'home_index': _encode_home_index(drone.home_index),
+        'return_path': np.array(drone.return_path, dtype=np.int32).reshape(-1, 2),
+        'rng': drone.rng.getstate(),
+        'planner': drone.planner,
+        'kinematics': drone.kinematics,
+        'belief_map': drone.belief_map
+    }
+    data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+    return zlib.compress(data, 1) if compress else data
+
+def restore(data, map_data, distance_field=None):
+    """Rebuild a SimulationEngine from snapshot() bytes, on the map the snapshot was taken on."""
+    if data[:1] != pickle.PROTO:
+        data = zlib.decompress(data)
+    state = pickle.loads(data)
+    if state['version'] != SNAPSHOT_VERSION:
+        raise ValueError(f"snapshot version {state['version']} is not supported (expected {SNAPSHOT_VERSION})")
+    engine = SimulationEngine(map_data, state['start_position'], state['far_point'], distance_field=distance_field,
+                              planner=state['planner'], kinematics=state['kinematics'],
+                              belief_map=state.get('belief_map'))
+    engine.steps = state['steps']
+    drone = engine.drone
+    for name, value in state['drone'].items():
+        setattr(drone, name, value)
+    drone.covered_area = _decode_coverage(state['coverage'])
+    drone.path = PathStore.from_array(state['path'])
+    drone.home_index = _decode_home_index(state['home_index'])
+    drone.adjacency_list = drone.home_index.adjacency
+    drone.return_path = [tuple(point) for point in state['return_path'].tolist()]
+    drone.rng = random.Random()
+    drone.rng.setstate(state['rng'])
+    return engine
+
+def _encode_coverage(coverage):
+    """Visited cells as flat indices and counts (per tile for TiledCoverage)."""
+    if isinstance(coverage, CoverageGrid):
+        counts = coverage.to_array().reshape(-1)
+        cells = np.flatnonzero(counts)
+        return {'shape': coverage.shape, 'cells': cells, 'counts': counts[cells]}
+    tiles = {}
+    for key, counts in coverage.tiles.items():
+        cells = np.flatnonzero(counts)
+        tiles[key] = (cells.astype(np.int32), counts.reshape(-1)[cells])
+    return {'tile_size': coverage.tile_size, 'tiles': tiles}
+
+def _decode_coverage(encoded):
+    if 'shape' in encoded:
+        counts = np.zeros(encoded['shape'], dtype=np.uint8)
+        counts.reshape(-1)[encoded['cells']] = encoded['counts']
+        return CoverageGrid.from_array(counts)
+    size = encoded['tile_size']
+    coverage = TiledCoverage(size)
+    for key, (cells, counts) in encoded['tiles'].items():
+        tile = coverage.tiles[key] = np.zeros((size, size), dtype=np.uint8)
+        tile.reshape(-1)[cells] = counts
+        coverage.size += len(cells)
+    return coverage
+
+def _encode_home_index(home_index):
+    """Nodes as an (N, 2) array, with each node's distance and parent (as node indices) and the edge list."""
+    nodes = list(home_index.distance)
+    nodes.extend(node for node in home_index.adjacency if node not in home_index.distance)
+    index = {node: i for i, node in enumerate(nodes)}
+    distance = np.array([home_index.distance.get(node, -1) for node in nodes], dtype=np.int32)
+    parent = np.array([index.get(home_index.parent.get(node), -1) for node in nodes], dtype=np.int32)
+    edges = [(index[a], index[b]) for a, neighbours in home_index.adjacency.items() for b in neighbours if index[a] < index[b]]
+    return {'home': home_index.home, 'nodes': np.array(nodes, dtype=np.int32).reshape(-1, 2),
+            'distance': distance, 'parent': parent, 'edges': np.array(edges, dtype=np.int32).reshape(-1, 2)}
+
+def _decode_home_index(encoded):
+    home_index = HomeIndex(encoded['home'])
+    nodes = [tuple(node) for node in encoded['nodes'].tolist()]
+    home_index.distance = {node: d for node, d in zip(nodes, encoded['distance'].tolist()) if d >= 0}
+    home_index.parent = {node: nodes[p] if p >= 0 else None
+                         for node, p, d in zip(nodes, encoded['parent'].tolist(), encoded['distance'].tolist()) if d >= 0}
+    neighbours = defaultdict(set)
+    for a, b in encoded['edges'].tolist():
+        neighbours[nodes[a]].add(nodes[b])
+        neighbours[nodes[b]].add(nodes[a])
+    home_index.adjacency = defaultdict(frozenset, {node: frozenset(adjacent) for node, adjacent in neighbours.items()})
+    return home_index
+
+class MissionRecorder:
+    """Flies a mission while keeping a snapshot every `interval` steps, to jump back to any step.
+
+    Missions are deterministic given their state, so fast_forward(n) restores the last
+    keyframe at or before step n and steps headlessly from there. Moves given to step()
+    (commands that overrode the planner) are recorded too and replayed.
+    """
+    def __init__(self, engine, interval=1000, keyframes=None, moves=None):
+        self.engine = engine
+        self.interval = interval
+        self.keyframes = keyframes if keyframes is not None else {engine.steps: snapshot(engine)}
+        self.moves = moves if moves is not None else {}  # Step -> move flown instead of the planner's
+        self.map_data = engine.map_data
+        self.distance_field = engine.drone.distance_field
+
+    def step(self, move=None):
+        """Step the engine, keeping a keyframe every interval steps."""
+        if move is not None:
+            self.moves[self.engine.steps] = move
+        state = self.engine.step(move)
+        if self.engine.steps % self.interval == 0:
+            self.keyframes[self.engine.steps] = snapshot(self.engine)
+        return state
+
+    def run(self, max_steps=None):
+        """Step until the drone lands (or max_steps ticks have run) and return the drone."""
+        while not self.engine.finished and (max_steps is None or self.engine.steps < max_steps):
+            self.step()
+        return self.engine.drone
+
+    def fast_forward(self, step):
+        """A new engine at the given step of the recorded mission (or where it ended), without rendering."""
+        start = max(key for key in self.keyframes if key <= step)
+        engine = restore(self.keyframes[start], self.map_data, self.distance_field)
+        while engine.steps < step and not engine.finished:
+            engine.step(self.moves.get(engine.steps))
+        return engine
+
+    def save(self, path):
+        """Write the keyframes (including the current step) and recorded moves to a file."""
+        if self.engine.steps not in self.keyframes:
+            self.keyframes[self.engine.steps] = snapshot(self.engine)
+        with open(path, "wb") as recording_file:
+            pickle.dump({'version': SNAPSHOT_VERSION, 'interval': self.interval, 'keyframes': self.keyframes,
+                         'moves': self.moves}, recording_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path, map_data, distance_field=None):
+        """Open a recording written by save() for fast-forwarding, on the map it was recorded on."""
+        with open(path, "rb") as recording_file:
+            recording = pickle.load(recording_file)
+        if recording['version'] != SNAPSHOT_VERSION:
+            raise ValueError(f"recording version {recording['version']} is not supported (expected {SNAPSHOT_VERSION})")
+        engine = restore(recording['keyframes'][max(recording['keyframes'])], map_data, distance_field)
+        return cls(engine, recording['interval'], recording['keyframes'], recording['moves'])
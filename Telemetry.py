@@ -0,0 +1,75 @@
+import numpy as np
+from Drone import FLIGHT_STATES
+
+# Verbosity levels: nothing, flight state only, flight state plus every sensor reading
+TELEMETRY_OFF, TELEMETRY_STATE, TELEMETRY_SENSORS = range(3)
+
+# One fixed-size binary record per step, flight_state is an index into FLIGHT_STATES and
+# path_length the number of cells on the drone's path so far
+TELEMETRY_DTYPE = np.dtype([
+    ('step', np.int64), ('time', np.float64), ('x', np.int32), ('y', np.int32),
+    ('battery', np.float32), ('flight_state', np.uint8), ('path_length', np.int64),
+    ('d0', np.float32), ('d1', np.float32), ('d2', np.float32), ('d3', np.float32), ('d4', np.float32),
+    ('yaw', np.float32), ('Vx', np.float32), ('Vy', np.float32), ('Z', np.float32), ('baro', np.float32),
+    ('bat', np.float32), ('pitch', np.float32), ('roll', np.float32),
+    ('accX', np.float32), ('accY', np.float32), ('accZ', np.float32)
+])
+SENSOR_FIELDS = TELEMETRY_DTYPE.names[7:]
+NO_SENSORS = (np.nan,) * len(SENSOR_FIELDS)
+
+class Telemetry:
+    """Per-step flight recorder backed by a preallocated ring buffer of binary records.
+
+    Without a path the buffer keeps the latest `capacity` steps. With a path, full buffers
+    are appended to that file, so no step is lost; call flush() at the end of a run.
+    """
+    def __init__(self, capacity=65536, level=TELEMETRY_SENSORS, path=None):
+        self.level = level
+        self.path = path
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=TELEMETRY_DTYPE)
+        self.count = 0  # Records written since the start
+        self.flushed = 0  # Records already appended to the file
+        self._state_codes = {state: code for code, state in enumerate(FLIGHT_STATES)}
+
+    def record(self, step, drone):
+        """Record the state of the drone after a step."""
+        if self.level == TELEMETRY_OFF:
+            return
+        if self.level >= TELEMETRY_SENSORS:
+            sensors = drone.get_sensor_data()
+            readings = tuple(sensors[name] for name in SENSOR_FIELDS)
+        else:
+            readings = NO_SENSORS
+        x, y = drone.position
+        self.buffer[self.count % self.capacity] = (step, drone.time_elapsed, x, y, drone.battery_level,
+                                                    self._state_codes[drone.flight_state], len(drone.path)) + readings
+        self.count += 1
+        if self.path is not None and self.count - self.flushed == self.capacity:
+            self.flush()
+
+    def records(self):
+        """Buffered records, oldest first."""
+        if self.count <= self.capacity:
+            return self.buffer[:self.count].copy()
+        start = self.count % self.capacity
+        return np.concatenate([self.buffer[start:], self.buffer[:start]])
+
+    def flush(self, path=None):
+        """Append the records not yet written to the telemetry file in one bulk write."""
+        path = path or self.path
+        pending = min(self.count - self.flushed, self.capacity)
+        if path is None or pending == 0:
+            return
+        first = (self.count - pending) % self.capacity
+        with open(path, "ab") as log_file:
+            if first + pending <= self.capacity:
+                self.buffer[first:first + pending].tofile(log_file)
+            else:
+                self.buffer[first:].tofile(log_file)
+                self.buffer[:first + pending - self.capacity].tofile(log_file)
+        self.flushed = self.count
+
+def load_telemetry(path):
+    """Load a telemetry file written by Telemetry.flush as a structured array (one column per field)."""
+    return np.fromfile(path, dtype=TELEMETRY_DTYPE)
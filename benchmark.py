@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+import numpy as np
+from DistanceField import distance_model
+from DroneFleet import DroneFleet
+from Kinematics import KinematicsModel
+from MapGenerator import generate_map
+from Planner import FrontierPlanner
+from SimulationEngine import SimulationEngine
+
+def _rate(count, seconds):
+    return count / seconds if seconds > 0 else float("inf")
+
+def bench_steps(map_data, start_position, steps, **drone_options):
+    """Headless mission steps per second while exploring."""
+    engine = SimulationEngine(map_data, start_position, start_position, seed=0, return_battery_level=None, **drone_options)
+    began = time.perf_counter()
+    engine.run(steps)
+    elapsed = time.perf_counter() - began
+    return {'steps': engine.steps, 'seconds': elapsed, 'steps_per_sec': _rate(engine.steps, elapsed),
+            'cells_per_step': len(engine.drone.path) / max(engine.steps, 1)}
+
+def bench_sensors(map_data, start_position, reads):
+    """get_sensor_data() calls per second, and the one-off cost of building the distance tables."""
+    began = time.perf_counter()
+    engine = SimulationEngine(map_data, start_position, start_position, seed=0)
+    setup = time.perf_counter() - began
+    drone = engine.drone
+    began = time.perf_counter()
+    for _ in range(reads):
+        drone.get_sensor_data()
+    elapsed = time.perf_counter() - began
+    return {'setup_seconds': setup, 'reads': reads, 'reads_per_sec': _rate(reads, elapsed)}
+
+def bench_return_path(map_data, start_position, checkpoints, repeats=20):
+    """Latency of planning the way home against the size of the explored graph."""
+    engine = SimulationEngine(map_data, start_position, start_position, seed=0, planner=FrontierPlanner(), return_battery_level=-float("inf"))
+    drone = engine.drone
+    results = []
+    for checkpoint in checkpoints:
+        engine.run(checkpoint)
+        began = time.perf_counter()
+        for _ in range(repeats):
+            path = drone.home_index.path_home(drone.position)
+        elapsed = (time.perf_counter() - began) / repeats
+        results.append({'steps': engine.steps, 'graph_nodes': len(drone.home_index.distance),
+                        'path_length': len(path), 'seconds': elapsed})
+    return results
+
+def bench_frames(map_data, start_position, frames):
+    """Frame time of the viewer rendering into a headless (dummy) display."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    from DroneSimulator import DroneSimulator
+    simulator = DroneSimulator(map_data, start_position, start_position, start=False)
+    engine = simulator.engine
+
+    began = time.perf_counter()
+    simulator.render_frame()
+    first = time.perf_counter() - began
+
+    began = time.perf_counter()
+    for _ in range(frames):
+        engine.step()
+        simulator.render_frame()
+    elapsed = time.perf_counter() - began
+    return {'first_frame_seconds': first, 'frames': frames, 'frame_seconds': elapsed / frames,
+            'fps': _rate(frames, elapsed)}
+
+def bench_memory(map_data, start_position, steps):
+    """Peak Python memory of one drone flying a mission, excluding the map and its distance tables.
+
+    Those are built before tracing starts and can be shared by every drone on the map, so
+    the figure is the drone's own state (coverage, path, home index).
+    """
+    distance_field = distance_model(map_data)
+    tracemalloc.start()
+    began = tracemalloc.get_traced_memory()[0]
+    engine = SimulationEngine(map_data, start_position, start_position, seed=0, return_battery_level=None,
+                              distance_field=distance_field)
+    engine.run(steps)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'steps': engine.steps, 'current_bytes': current - began, 'peak_bytes': peak - began}
+
+def bench_fleet(map_data, start_position, drones, steps):
+    """Drone-steps per second of the batched fleet."""
+    fleet = DroneFleet(map_data, [start_position] * drones, seed=0)
+    began = time.perf_counter()
+    fleet.run(steps)
+    elapsed = time.perf_counter() - began
+    return {'drones': drones, 'steps': fleet.steps, 'drone_steps_per_sec': _rate(drones * fleet.steps, elapsed)}
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def run_benchmarks(sizes, density, quick=False, seed=0):
+    """Run every benchmark on a generated map of each size and return the report."""
+    scale = 10 if quick else 1
+    report = {
+        'revision': _git_revision(),
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'obstacle_density': density,
+        'maps': []
+    }
+    for size in sizes:
+        map_data, start_position = generate_map(size, density, seed)
+        results = {
+            'size': size,
+            'steps': bench_steps(map_data, start_position, 20000 // scale),
+            'kinematic_steps': bench_steps(map_data, start_position, 20000 // scale, kinematics=KinematicsModel()),
+            'sensors': bench_sensors(map_data, start_position, 100000 // scale),
+            'return_path': bench_return_path(map_data, start_position, [1000 // scale, 10000 // scale, 30000 // scale]),
+            'memory': bench_memory(map_data, start_position, 20000 // scale),
+            'fleet': bench_fleet(map_data, start_position, 1000 // scale, 500 // scale)
+        }
+        try:
+            results['frames'] = bench_frames(map_data, start_position, 500 // scale)
+        except Exception as error:  # No pygame or no usable display driver
+            results['frames'] = {'error': str(error)}
+        report['maps'].append(results)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the drone simulator on generated maps.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[150, 500, 2000], help="Map sizes (cells per side)")
+    parser.add_argument("--density", type=float, default=0.1, help="Share of wall cells in the generated maps")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the map generator")
+    parser.add_argument("--quick", action="store_true", help="Run ten times fewer iterations")
+    parser.add_argument("--output", default="benchmark_report.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, args.density, args.quick, args.seed)
+    with open(args.output, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+    for results in report['maps']:
+        print(f"{results['size']}x{results['size']}: "
+              f"{results['steps']['steps_per_sec']:.0f} steps/s, "
+              f"{results['kinematic_steps']['steps_per_sec']:.0f} kinematic steps/s, "
+              f"{results['sensors']['reads_per_sec']:.0f} sensor reads/s, "
+              f"{results['fleet']['drone_steps_per_sec']:.0f} fleet drone-steps/s, "
+              f"peak {results['memory']['peak_bytes'] / 1024:.0f} KiB per drone")
+    print(f"Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
+import logging
 import numpy as np
 from DroneSimulator import DroneSimulator
 
 # Main function to run the simulator
 def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     map_size = (150, 150)  # Scaled map size for better visibility
     map_data = np.ones(map_size)
 